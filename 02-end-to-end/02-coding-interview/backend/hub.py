@@ -0,0 +1,60 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class SessionHub:
+    """In-process pub/sub of session state, keyed by session id.
+
+    Every subscriber gets a queue holding only the latest message it has not
+    read yet: state updates are full snapshots, so a slow client skips the
+    stale ones instead of buffering them. `publish` can be called from any
+    thread (the sync routes run in a threadpool); delivery is handed to the
+    event loop of each subscriber.
+
+    The hub only reaches clients connected to this process, so the app must
+    run as a single worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, dict[asyncio.Queue, asyncio.AbstractEventLoop]] = defaultdict(dict)
+
+    def subscribe(self, session_id: str) -> asyncio.Queue:
+        """Return a queue receiving the messages published to a session; call from the event loop."""
+        queue = asyncio.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers[session_id][queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(session_id)
+            if subscribers is not None:
+                subscribers.pop(queue, None)
+                if not subscribers:
+                    del self._subscribers[session_id]
+
+    def subscriber_count(self, session_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(session_id, ()))
+
+    def publish(self, session_id: str, message) -> None:
+        """Send a message to every subscriber of a session, replacing any message they have not read."""
+        with self._lock:
+            targets = list(self._subscribers.get(session_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, message)
+            except RuntimeError:
+                # The subscriber's loop is closed; it is unsubscribed when its socket handler exits
+                pass
+
+
+def _put_latest(queue: asyncio.Queue, message) -> None:
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+hub = SessionHub()
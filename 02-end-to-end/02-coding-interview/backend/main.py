@@ -1,13 +1,16 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import Session, select
 from contextlib import asynccontextmanager
 from typing import Annotated
+import asyncio
 import uuid
 
 from .database import create_db_and_tables, get_session
 from .models import Session as InterviewSession, SessionState, User, Token
 from .auth import get_password_hash, verify_password, create_access_token, get_current_user
+from .hub import hub
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -76,6 +79,8 @@ def end_session(session_id: str, db: DbSession, current_user: str = Depends(get_
         raise HTTPException(status_code=404, detail="Session not found")
     db.delete(session)
     db.commit()
+    # Tell connected participants the session is gone
+    hub.publish(session_id, None)
     return {"message": "Session ended"}
 
 @app.get("/sessions/{session_id}/state", response_model=SessionState)
@@ -96,7 +101,49 @@ def update_session_state(session_id: str, state: SessionState, db: DbSession):
     db.add(session)
     db.commit()
     db.refresh(session)
-    return SessionState(code=session.code, language=session.language)
+    new_state = SessionState(code=session.code, language=session.language)
+    hub.publish(session_id, new_state.model_dump())
+    return new_state
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Messages from the client are ignored; state is updated through POST /sessions/{id}/state
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@app.websocket("/sessions/{session_id}/ws")
+async def session_state_ws(websocket: WebSocket, session_id: str, db: DbSession):
+    # Push the state on connect and after every update, so clients need not poll GET /state
+    # Subscribe before reading the state so no update between the two is missed
+    queue = hub.subscribe(session_id)
+    disconnected = None
+    try:
+        session = await run_in_threadpool(db.get, InterviewSession, session_id)
+        if not session:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Session not found")
+            return
+        state = SessionState(code=session.code, language=session.language)
+        # Release the database connection: the socket may stay open for the whole interview
+        await run_in_threadpool(db.close)
+
+        await websocket.accept()
+        await websocket.send_json(state.model_dump())
+        disconnected = asyncio.ensure_future(_wait_for_disconnect(websocket))
+        while True:
+            message = asyncio.ensure_future(queue.get())
+            await asyncio.wait({message, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                message.cancel()
+                break
+            if message.result() is None:
+                await websocket.close(reason="Session ended")
+                break
+            await websocket.send_json(message.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(session_id, queue)
+        if disconnected is not None:
+            disconnected.cancel()
 
 import os
 from fastapi.staticfiles import StaticFiles
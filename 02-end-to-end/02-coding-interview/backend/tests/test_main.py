@@ -1,4 +1,5 @@
 from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
 from sqlmodel import Session, SQLModel, create_engine
 from sqlmodel.pool import StaticPool
 import pytest
@@ -7,6 +8,7 @@ from ..main import app, get_session
 from ..database import engine as prod_engine
 from ..models import User
 from ..auth import get_password_hash
+from ..hub import hub
 
 # Use in-memory SQLite for testing
 test_engine = create_engine(
@@ -88,3 +90,34 @@ def test_integration_flow(client: TestClient, session: Session):
     response = client.get(f"/sessions/{session_id}")
     assert response.status_code == 404
 
+
+def test_session_state_websocket(client: TestClient, session: Session):
+    user = User(email="admin@example.com", hashed_password=get_password_hash("password"))
+    session.add(user)
+    session.commit()
+
+    login_data = {"username": "admin@example.com", "password": "password"}
+    token = client.post("/auth/login", data=login_data).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    session_id = client.post("/sessions", headers=headers).json()["id"]
+
+    with client.websocket_connect(f"/sessions/{session_id}/ws") as websocket:
+        # 1. Current state on connect
+        assert websocket.receive_json() == {"code": "", "language": "javascript"}
+
+        # 2. Updates are pushed as soon as they are committed
+        new_state = {"code": "print('hello')", "language": "python"}
+        response = client.post(f"/sessions/{session_id}/state", json=new_state, headers=headers)
+        assert response.status_code == 200
+        assert websocket.receive_json() == new_state
+
+        # 3. Ending the session closes the socket
+        client.delete(f"/sessions/{session_id}", headers=headers)
+        with pytest.raises(WebSocketDisconnect):
+            websocket.receive_json()
+    assert hub.subscriber_count(session_id) == 0
+
+    # Unknown sessions are rejected
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/sessions/missing/ws"):
+            pass
@@ -1,8 +1,12 @@
 import { useEffect, useState, useRef } from "react";
 import type { SessionState, SupportedLanguage } from "@/utils/session";
-import { getSessionState, updateSessionState, DEFAULT_SNIPPETS } from "@/utils/session";
+import { getSessionState, updateSessionState, sessionStateSocketUrl, DEFAULT_SNIPPETS } from "@/utils/session";
 import { toast } from "sonner";
 
+// Polling is only the fallback for when the state socket is unavailable
+const POLL_INTERVAL_MS = 2000;
+const RECONNECT_DELAY_MS = 5000;
+
 export interface UseCollaborativeSessionOptions {
   sessionId: string;
   initialLanguage?: SupportedLanguage;
@@ -24,30 +28,70 @@ export const useCollaborativeSession = (
   });
 
   const isLocalChange = useRef(false);
+  // Last state we sent, so its echo from the server does not overwrite newer local edits
+  const lastSent = useRef<SessionState | null>(null);
 
   useEffect(() => {
     let isMounted = true;
+    let socket: WebSocket | null = null;
+    let pollTimer: ReturnType<typeof setInterval> | undefined;
+    let reconnectTimer: ReturnType<typeof setTimeout> | undefined;
+
+    const applyRemoteState = (remoteState: SessionState) => {
+      if (!isMounted || isLocalChange.current) return;
+      const sent = lastSent.current;
+      if (sent && sent.code === remoteState.code && sent.language === remoteState.language) return;
+      lastSent.current = null;
+      setState({
+        code: remoteState.code || DEFAULT_SNIPPETS[remoteState.language as SupportedLanguage] || "",
+        language: remoteState.language as SupportedLanguage
+      });
+    };
 
     const fetchState = async () => {
       try {
-        const remoteState = await getSessionState(sessionId);
-        if (isMounted && !isLocalChange.current) {
-          setState({
-            code: remoteState.code || DEFAULT_SNIPPETS[remoteState.language as SupportedLanguage] || "",
-            language: remoteState.language as SupportedLanguage
-          });
-        }
+        applyRemoteState(await getSessionState(sessionId));
       } catch (error) {
         // console.error("Failed to fetch session state", error);
       }
     };
 
-    fetchState();
-    const interval = setInterval(fetchState, 2000);
+    const startPolling = () => {
+      if (pollTimer !== undefined) return;
+      fetchState();
+      pollTimer = setInterval(fetchState, POLL_INTERVAL_MS);
+    };
+
+    const stopPolling = () => {
+      clearInterval(pollTimer);
+      pollTimer = undefined;
+    };
+
+    const connect = () => {
+      if (typeof WebSocket === "undefined") {
+        startPolling();
+        return;
+      }
+      socket = new WebSocket(sessionStateSocketUrl(sessionId));
+      // The server sends the current state on connect and after every update
+      socket.onopen = stopPolling;
+      socket.onmessage = (event) => applyRemoteState(JSON.parse(event.data));
+      socket.onclose = (event) => {
+        socket = null;
+        if (!isMounted || event.reason === "Session ended") return;
+        // Poll until the socket can be reopened (e.g. a backend without the endpoint)
+        startPolling();
+        reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+      };
+    };
+
+    connect();
 
     return () => {
       isMounted = false;
-      clearInterval(interval);
+      stopPolling();
+      clearTimeout(reconnectTimer);
+      socket?.close();
     };
   }, [sessionId]);
 
@@ -55,6 +99,7 @@ export const useCollaborativeSession = (
     const newState = { ...state, language, code: DEFAULT_SNIPPETS[language] };
     setState(newState);
     isLocalChange.current = true;
+    lastSent.current = newState;
     try {
       const token = localStorage.getItem("token") || undefined;
       await updateSessionState(sessionId, newState, token);
@@ -74,6 +119,7 @@ export const useCollaborativeSession = (
   useEffect(() => {
     const timer = setTimeout(async () => {
       if (isLocalChange.current) {
+        lastSent.current = state;
         try {
           const token = localStorage.getItem("token") || undefined;
           await updateSessionState(sessionId, state, token);
@@ -52,6 +52,12 @@ export const getSessionState = async (sessionId: string) => {
   return response.json();
 };
 
+// Pushes the session state on connect and after every update (see useCollaborativeSession)
+export const sessionStateSocketUrl = (sessionId: string) => {
+  const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+  return `${protocol}//${window.location.host}/sessions/${sessionId}/ws`;
+};
+
 export const updateSessionState = async (sessionId: string, state: { code: string; language: string }, token?: string) => {
   const headers: Record<string, string> = {
     "Content-Type": "application/json",
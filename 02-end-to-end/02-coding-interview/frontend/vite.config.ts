@@ -10,7 +10,7 @@ export default defineConfig(({ mode }) => ({
     port: 8080,
     proxy: {
       "/auth": "http://127.0.0.1:8000",
-      "/sessions": "http://127.0.0.1:8000",
+      "/sessions": { target: "http://127.0.0.1:8000", ws: true },
       "/health": "http://127.0.0.1:8000",
     },
   },
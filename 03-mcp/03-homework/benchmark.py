@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""Benchmark minsearch.Index fit and search on synthetic corpora.
+
+Every corpus size runs in a fresh process so peak RSS is measured per size.
+Results are written as JSON and can be compared against an earlier run.
+
+Usage examples:
+  python benchmark.py
+  python benchmark.py --sizes 10000 100000 1000000 -o results.json
+  python benchmark.py --engine inverted --scoring bm25 --compare results.json
+  python benchmark.py --sizes 100000 --compression
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from queue import Empty
+
+import numpy as np
+
+import minsearch
+
+SCENARIOS = ("plain", "filter", "boost", "filter_boost")
+
+
+def make_corpus(num_docs: int, args: argparse.Namespace) -> list[dict]:
+    """Generate documents whose words follow a Zipf distribution over a fixed vocabulary."""
+    rng = np.random.default_rng(args.seed)
+    vocabulary = np.array([f"term{i}" for i in range(args.vocab_size)])
+    ranks = np.arange(1, args.vocab_size + 1)
+    probabilities = 1.0 / ranks ** args.zipf
+    probabilities /= probabilities.sum()
+
+    docs = [{"id": str(i)} for i in range(num_docs)]
+    for field in args.text_fields:
+        lengths = rng.poisson(args.doc_words, size=num_docs) + 1
+        words = vocabulary[rng.choice(args.vocab_size, size=lengths.sum(), p=probabilities)]
+        bounds = np.concatenate(([0], np.cumsum(lengths)))
+        for doc, start, end in zip(docs, bounds[:-1], bounds[1:]):
+            doc[field] = " ".join(words[start:end])
+
+    for field in args.keyword_fields:
+        values = rng.integers(0, args.keyword_cardinality, size=num_docs)
+        for doc, value in zip(docs, values):
+            doc[field] = f"{field}-{value}"
+
+    return docs
+
+
+def make_queries(args: argparse.Namespace) -> list[str]:
+    """Generate queries of 1-4 words drawn uniformly from the more frequent half of the vocabulary."""
+    rng = np.random.default_rng(args.seed + 1)
+    queries = []
+    for _ in range(args.num_queries):
+        num_words = rng.integers(1, 5)
+        terms = rng.integers(0, max(args.vocab_size // 2, 1), size=num_words)
+        queries.append(" ".join(f"term{t}" for t in terms))
+    return queries
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in KB elsewhere
+    if sys.platform == "darwin":
+        return peak / 1024 / 1024
+    return peak / 1024
+
+
+def directory_size_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.iterdir() if f.is_file()) / 1024 / 1024
+
+
+def matrix_size_mb(index: minsearch.Index) -> float:
+    """Return the in-memory size of the text matrices (and postings) of an index in MB."""
+    total = 0
+    for matrices in (index.text_matrices, index.postings):
+        for matrix in matrices.values():
+            total += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+    return total / 1024 / 1024
+
+
+def latency_stats(timings: list[float]) -> dict:
+    ms = np.array(timings) * 1000
+    return {
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def run_size(num_docs: int, args: argparse.Namespace) -> dict:
+    """Build an index over a synthetic corpus of the given size and measure it."""
+    started = time.perf_counter()
+    docs = make_corpus(num_docs, args)
+    generate_s = time.perf_counter() - started
+    queries = make_queries(args)
+
+    index = minsearch.Index(
+        text_fields=args.text_fields,
+        keyword_fields=args.keyword_fields,
+        engine=args.engine,
+        scoring=args.scoring,
+    )
+    started = time.perf_counter()
+    index.fit(docs)
+    fit_s = time.perf_counter() - started
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        index.save(tmp)
+        save_s = time.perf_counter() - started
+        index_size_mb = directory_size_mb(Path(tmp))
+
+        started = time.perf_counter()
+        minsearch.Index.load(tmp, mmap=True)
+        load_s = time.perf_counter() - started
+
+    rng = np.random.default_rng(args.seed + 2)
+    boost_dict = {field: float(i + 1) for i, field in enumerate(args.text_fields)}
+    latencies = {}
+    for scenario in SCENARIOS:
+        timings = []
+        for query in queries:
+            filter_dict = None
+            if "filter" in scenario and args.keyword_fields:
+                field = args.keyword_fields[0]
+                filter_dict = {field: f"{field}-{rng.integers(0, args.keyword_cardinality)}"}
+            boost = boost_dict if "boost" in scenario else None
+
+            started = time.perf_counter()
+            index.search(query, filter_dict=filter_dict, boost_dict=boost, num_results=args.num_results)
+            timings.append(time.perf_counter() - started)
+        latencies[scenario] = latency_stats(timings)
+
+    started = time.perf_counter()
+    index.search_batch(queries, num_results=args.num_results)
+    batch_s = time.perf_counter() - started
+
+    return {
+        "num_docs": num_docs,
+        "generate_s": generate_s,
+        "fit_s": fit_s,
+        "save_s": save_s,
+        "load_s": load_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "index_size_mb": index_size_mb,
+        "matrix_size_mb": matrix_size_mb(index),
+        "docs_size_mb": index.docs.nbytes / 1024 / 1024,
+        "search": latencies,
+        "search_batch_qps": len(queries) / batch_s if batch_s > 0 else None,
+    }
+
+
+def compression_variants(args: argparse.Namespace) -> dict:
+    """Index options compared by the compression report, keyed by a short label."""
+    variants = {
+        "float64": {},
+        "float32": {"weight_dtype": "float32"},
+        "uint16": {"weight_dtype": "uint16"},
+        "uint8": {"weight_dtype": "uint8"},
+    }
+    for top_k in args.prune_top_k:
+        variants[f"float32+top{top_k}"] = {"weight_dtype": "float32", "prune_top_k": top_k}
+    for threshold in args.prune_threshold:
+        variants[f"float32+min{threshold:g}"] = {"weight_dtype": "float32", "prune_threshold": threshold}
+    return variants
+
+
+def run_compression(num_docs: int, args: argparse.Namespace) -> dict:
+    """Compare weight dtypes and pruning against a float64 index: memory saved versus ranking drift."""
+    docs = make_corpus(num_docs, args)
+    queries = make_queries(args)
+
+    rows = {}
+    baseline = None
+    for label, options in compression_variants(args).items():
+        index = minsearch.Index(
+            text_fields=args.text_fields,
+            keyword_fields=args.keyword_fields,
+            engine=args.engine,
+            scoring=args.scoring,
+            **options,
+        )
+        started = time.perf_counter()
+        index.fit(docs)
+        fit_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        results = index.search_batch(queries, num_results=args.num_results, output_fields=["id"])
+        search_s = time.perf_counter() - started
+
+        ranked = [[doc["id"] for doc in result] for result in results]
+        if baseline is None:
+            baseline = ranked
+        overlap = [
+            len(set(got) & set(expected)) / len(expected)
+            for got, expected in zip(ranked, baseline) if expected
+        ]
+        top1 = [got[:1] == expected[:1] for got, expected in zip(ranked, baseline) if expected]
+
+        rows[label] = {
+            "options": options,
+            "matrix_size_mb": matrix_size_mb(index),
+            "fit_s": fit_s,
+            "search_ms_per_query": search_s / len(queries) * 1000,
+            "overlap_at_k": float(np.mean(overlap)) if overlap else None,
+            "top1_agreement": float(np.mean(top1)) if top1 else None,
+        }
+
+    base_size = rows["float64"]["matrix_size_mb"]
+    for row in rows.values():
+        row["memory_saved"] = 1 - row["matrix_size_mb"] / base_size if base_size else None
+    return {"num_docs": num_docs, "variants": rows}
+
+
+def _run_isolated_worker(func, num_docs: int, args: argparse.Namespace, queue) -> None:
+    try:
+        queue.put(("ok", func(num_docs, args)))
+    except Exception as exc:
+        queue.put(("error", repr(exc)))
+
+
+def run_isolated(num_docs: int, args: argparse.Namespace, func=run_size) -> dict:
+    """Run one corpus size in a fresh process so its peak RSS is not inflated by earlier sizes."""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_isolated_worker, args=(func, num_docs, args, queue))
+    process.start()
+    # Poll, so a worker killed without replying (e.g. by the OOM killer) fails the run instead of hanging it
+    while True:
+        try:
+            status, result = queue.get(timeout=1)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+            try:
+                # The reply may have landed between the timeout and the exit check
+                status, result = queue.get(timeout=1)
+                break
+            except Empty:
+                raise RuntimeError(
+                    f"Benchmark for {num_docs} documents failed: worker exited with code {process.exitcode}"
+                ) from None
+    process.join()
+    if status == "error":
+        raise RuntimeError(f"Benchmark for {num_docs} documents failed: {result}")
+    return result
+
+
+def environment() -> dict:
+    import scipy
+    import sklearn
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "scikit-learn": sklearn.__version__,
+    }
+
+
+def print_result(result: dict) -> None:
+    print(
+        f"{result['num_docs']:>9} docs | fit {result['fit_s']:8.2f}s | load {result['load_s']:6.3f}s | "
+        f"rss {result['peak_rss_mb']:8.1f}MB | index {result['index_size_mb']:8.1f}MB"
+    )
+    for scenario, stats in result["search"].items():
+        print(
+            f"{'':>9}   {scenario:<13} p50 {stats['p50_ms']:8.2f}ms  "
+            f"p95 {stats['p95_ms']:8.2f}ms  p99 {stats['p99_ms']:8.2f}ms"
+        )
+
+
+def print_compression(report: dict) -> None:
+    print(f"{report['num_docs']:>9} docs | compression report (overlap and top-1 against float64)")
+    for label, row in report["variants"].items():
+        print(
+            f"{'':>9}   {label:<18} matrices {row['matrix_size_mb']:8.1f}MB  saved {row['memory_saved']:6.1%}  "
+            f"search {row['search_ms_per_query']:7.2f}ms/q  overlap@k {row['overlap_at_k']:.3f}  "
+            f"top1 {row['top1_agreement']:.3f}"
+        )
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    """Print the ratio of each metric against a previous run (above 1.0 means slower or bigger)."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["num_docs"]: r for r in json.load(f)["results"]}
+
+    print(f"\nCompared to {baseline_path}:")
+    for result in results:
+        base = baseline.get(result["num_docs"])
+        if base is None:
+            continue
+        ratios = [
+            f"fit x{result['fit_s'] / base['fit_s']:.2f}",
+            f"rss x{result['peak_rss_mb'] / base['peak_rss_mb']:.2f}",
+        ]
+        for scenario in SCENARIOS:
+            if scenario in base["search"]:
+                ratio = result["search"][scenario]["p95_ms"] / base["search"][scenario]["p95_ms"]
+                ratios.append(f"{scenario} p95 x{ratio:.2f}")
+        print(f"{result['num_docs']:>9} docs | " + " | ".join(ratios))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark minsearch.Index fit and search on synthetic corpora.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Corpus sizes to benchmark (default: 10000 100000)")
+    parser.add_argument("--text-fields", nargs="+", default=["content", "title"], help="Text fields to generate (default: content title)")
+    parser.add_argument("--keyword-fields", nargs="*", default=["filename"], help="Keyword fields to generate (default: filename)")
+    parser.add_argument("--doc-words", type=int, default=100, help="Average number of words per text field (default: 100)")
+    parser.add_argument("--vocab-size", type=int, default=50_000, help="Vocabulary size (default: 50000)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of the word distribution (default: 1.1)")
+    parser.add_argument("--keyword-cardinality", type=int, default=1000, help="Distinct values per keyword field (default: 1000)")
+    parser.add_argument("--num-queries", type=int, default=200, help="Queries per scenario (default: 200)")
+    parser.add_argument("--num-results", type=int, default=10, help="num_results passed to search (default: 10)")
+    parser.add_argument("--engine", choices=minsearch.ENGINES, default="dense", help="Index engine (default: dense)")
+    parser.add_argument("--scoring", choices=minsearch.SCORINGS, default="tfidf", help="Index scoring (default: tfidf)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Where to write the JSON results (default: benchmark_results.json)")
+    parser.add_argument("--compare", metavar="JSON", help="Previous results file to compare against")
+    parser.add_argument("--compression", action="store_true", help="Also report memory saved versus ranking drift of weight dtypes and pruning")
+    parser.add_argument("--prune-top-k", type=int, nargs="*", default=[64, 16], help="prune_top_k values in the compression report (default: 64 16)")
+    parser.add_argument("--prune-threshold", type=float, nargs="*", default=[], help="prune_threshold values in the compression report")
+    args = parser.parse_args()
+
+    results = []
+    for num_docs in args.sizes:
+        result = run_isolated(num_docs, args)
+        print_result(result)
+        results.append(result)
+
+    compression = []
+    if args.compression:
+        for num_docs in args.sizes:
+            report = run_isolated(num_docs, args, func=run_compression)
+            print_compression(report)
+            compression.append(report)
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "config": vars(args),
+        "results": results,
+    }
+    if compression:
+        report["compression"] = compression
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Persistent cache of fetched pages.
+
+Entries are keyed by the normalized URL of the page and stored in a small
+SQLite database, while page bodies are kept as zlib-compressed blobs named
+after the SHA-256 of their content (so identical pages are stored once).
+Entries younger than the TTL are served without a request; older ones are
+revalidated with If-None-Match / If-Modified-Since when the server sent an
+ETag or Last-Modified header. The compressed size of the blobs is bounded by
+evicting the least recently used entries.
+
+Blobs can be written and read back in chunks, so streamed pages never need to
+be held in memory whole.
+"""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "jina-download"
+DEFAULT_TTL = 3600
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+)
+"""
+
+
+def normalize_url(url: str) -> str:
+    """Return a canonical form of a page URL for use as a cache key.
+
+    Adds a missing https:// scheme, lowercases the scheme and host, drops the
+    default port and the fragment, and sorts the query parameters.
+    """
+    if not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class BlobWriter:
+    """Compress a page into the cache chunk by chunk; see ResponseCache.writer."""
+
+    def __init__(self, cache: "ResponseCache", key: str, url: str):
+        self._cache = cache
+        self.key = key
+        self.url = url
+        self._tmp = cache.blob_dir / f"incoming-{os.getpid()}-{threading.get_ident()}-{id(self)}.tmp"
+        self._file = open(self._tmp, "wb")
+        self._compressor = zlib.compressobj()
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str) -> None:
+        data = text.encode("utf-8")
+        self._hash.update(data)
+        compressed = self._compressor.compress(data)
+        self._file.write(compressed)
+        self.size += len(compressed)
+
+    def commit(self, headers=None) -> None:
+        """Finish the blob and store the entry, with the ETag / Last-Modified of the response headers."""
+        compressed = self._compressor.flush()
+        self._file.write(compressed)
+        self.size += len(compressed)
+        self._file.close()
+        self._cache._commit(self, self._tmp, self._hash.hexdigest(), headers or {})
+
+    def abort(self) -> None:
+        """Discard the partly written blob."""
+        self._file.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class ResponseCache:
+    """On-disk cache of page bodies with TTL, conditional revalidation and LRU eviction.
+
+    Parameters
+    - directory: where the database and blobs are kept
+    - ttl: seconds an entry is served without contacting the server
+    - max_bytes: bound on the total compressed size of the stored blobs
+
+    The cache only stores and looks up responses; callers do the HTTP requests:
+    serve ``lookup(key)["content"]`` when the entry is 'fresh', otherwise send
+    the ``validators`` headers, then call ``revalidated`` on a 304 or ``store``
+    on a 200. Streaming callers use ``lookup(key, load=False)`` with
+    ``iter_content`` and write pages through ``writer``. Safe to share between
+    threads.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path = DEFAULT_CACHE_DIR,
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / "cache.sqlite", check_same_thread=False)
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.zlib"
+
+    def lookup(self, key: str, load: bool = True) -> dict | None:
+        """Return the cached entry of a key, or None.
+
+        The entry has the 'content' (only if ``load``), 'url', 'digest', 'etag',
+        'last_modified', 'fetched_at' and whether it is still 'fresh'. Counts a
+        hit for fresh entries, a stale lookup otherwise, and a miss when there
+        is no usable entry.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, etag, last_modified, fetched_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            url, digest, etag, last_modified, fetched_at = row
+            path = self._blob_path(digest)
+            try:
+                if load:
+                    content = zlib.decompress(path.read_bytes()).decode("utf-8")
+                elif not path.exists():
+                    raise FileNotFoundError(path)
+            except (OSError, zlib.error):
+                # Blob lost or damaged; forget the entry so it is fetched again
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+                self._counters["misses"] += 1
+                return None
+
+            now = time.time()
+            fresh = now - fetched_at < self.ttl
+            self._counters["hits" if fresh else "stale"] += 1
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        entry = {
+            "url": url,
+            "digest": digest,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": fetched_at,
+            "fresh": fresh,
+        }
+        if load:
+            entry["content"] = content
+        return entry
+
+    def iter_content(self, entry: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+        """Yield the content of an entry in chunks, decompressing it as it is read."""
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with open(self._blob_path(entry["digest"]), "rb") as f:
+            while data := f.read(chunk_size):
+                # Bound the output of each step, as compressed data can expand a lot
+                while data:
+                    text = decoder.decode(decompressor.decompress(data, chunk_size))
+                    data = decompressor.unconsumed_tail
+                    if text:
+                        yield text
+        text = decoder.decode(decompressor.flush(), final=True)
+        if text:
+            yield text
+
+    @staticmethod
+    def validators(entry: dict | None) -> dict:
+        """Return the conditional request headers for revalidating an entry."""
+        headers = {}
+        if entry is not None:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def revalidated(self, key: str) -> None:
+        """Mark an entry fresh again after the server answered 304 Not Modified."""
+        with self._lock:
+            now = time.time()
+            self._db.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            self._db.commit()
+            self._counters["revalidated"] += 1
+
+    def writer(self, key: str, url: str) -> BlobWriter:
+        """Return a writer that stores a page under a key as it is written in chunks.
+
+        Call ``commit(headers)`` once the whole page is written, or ``abort()``
+        if the download fails.
+        """
+        return BlobWriter(self, key, url)
+
+    def store(self, key: str, url: str, content: str, headers=None) -> None:
+        """Store a fetched page under a key, with the ETag / Last-Modified of its response headers."""
+        writer = self.writer(key, url)
+        writer.write(content)
+        writer.commit(headers)
+
+    def _commit(self, writer: BlobWriter, tmp: Path, digest: str, headers) -> None:
+        """Move a written blob into place and point the writer's key at it."""
+        key = writer.key
+        path = self._blob_path(digest)
+        with self._lock:
+            if path.exists():
+                tmp.unlink()
+            else:
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp, path)
+            old = self._db.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, writer.url, digest, writer.size, headers.get("etag"), headers.get("last-modified"), now, now),
+            )
+            if old is not None and old[0] != digest:
+                self._release_blob(old[0])
+            self._counters["stored"] += 1
+            self._evict()
+            self._db.commit()
+
+    def _release_blob(self, digest: str) -> None:
+        """Delete a blob once no entry refers to it."""
+        if self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+            self._blob_path(digest).unlink(missing_ok=True)
+
+    def _blob_bytes(self) -> int:
+        """Total size of the distinct blobs referenced by entries."""
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+        ).fetchone()
+        return total
+
+    def _evict(self) -> None:
+        """Drop the least recently used entries until the blobs fit in max_bytes."""
+        total = self._blob_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, digest FROM entries ORDER BY accessed_at").fetchall()
+        for key, digest in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._release_blob(digest)
+            self._counters["evicted"] += 1
+            total = self._blob_bytes()
+
+    def clear(self) -> None:
+        """Remove every entry and blob."""
+        with self._lock:
+            for (digest,) in self._db.execute("SELECT DISTINCT digest FROM entries").fetchall():
+                self._blob_path(digest).unlink(missing_ok=True)
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        """Return the hit/miss counters of this instance and the number and size of the stored entries."""
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            stats = dict(self._counters, entries=entries, bytes=self._blob_bytes(), max_bytes=self.max_bytes)
+        lookups = stats["hits"] + stats["stale"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,141 @@
+"""Split markdown documents into passages for passage-level search.
+
+Documents are cut at headings first, then at paragraph breaks (and as a last
+resort at whitespace) so that no passage is longer than ``max_chars``. Every
+passage keeps a reference to its parent document, the heading path it sits
+under, and the character offsets of its text in the parent content.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable, Iterator
+
+DEFAULT_MAX_CHARS = 2000
+DEFAULT_MIN_CHARS = 200
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+PARAGRAPH_BREAK_RE = re.compile(r"\n\s*\n")
+
+
+def _sections(text: str) -> list[tuple[int, int, str]]:
+    """Return (start, end, heading path) of the heading-delimited sections of the text.
+
+    Lines inside fenced code blocks are never treated as headings.
+    """
+    sections = []
+    stack: list[tuple[int, str]] = []
+    section_start = 0
+    section_heading = ""
+    in_fence = False
+    offset = 0
+
+    for line in text.splitlines(keepends=True):
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line.rstrip("\r\n"))
+        if match:
+            if offset > section_start:
+                sections.append((section_start, offset, section_heading))
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2)))
+            section_start = offset
+            section_heading = " > ".join(title for _, title in stack)
+        offset += len(line)
+
+    if offset > section_start:
+        sections.append((section_start, offset, section_heading))
+    return sections
+
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Split text[start:end] into spans of at most max_chars, preferring paragraph breaks, then whitespace.
+
+    Breaks are only taken from the second half of the window so no span ends up tiny.
+    """
+    spans = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        earliest = start + max_chars // 2
+        cut = None
+        for match in PARAGRAPH_BREAK_RE.finditer(text, earliest, limit):
+            cut = match.end()
+        if cut is None:
+            whitespace = max(text.rfind(" ", earliest, limit), text.rfind("\n", earliest, limit))
+            cut = whitespace + 1 if whitespace >= 0 else limit
+        spans.append((start, cut))
+        start = cut
+    spans.append((start, end))
+    return spans
+
+
+def _trim(text: str, start: int, end: int) -> tuple[int, int]:
+    """Shrink the span so it neither starts nor ends with whitespace."""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+def chunk_markdown(
+    text: str,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    min_chars: int = DEFAULT_MIN_CHARS,
+) -> list[dict]:
+    """Split markdown text into passages.
+
+    Sections shorter than ``min_chars`` (e.g. a heading directly followed by a
+    sub-heading) are merged into the next section while the result stays under
+    ``max_chars``; the merged passage keeps the first non-empty heading path.
+    Sections longer than ``max_chars`` are split further.
+
+    Returns a list of dicts with 'heading', 'start' and 'end', where
+    text[start:end] is the passage text.
+    """
+    merged: list[list] = []
+    for start, end, heading in _sections(text):
+        if merged:
+            previous = merged[-1]
+            if previous[1] - previous[0] < min_chars and end - previous[0] <= max_chars:
+                previous[1] = end
+                previous[2] = previous[2] or heading
+                continue
+        merged.append([start, end, heading])
+
+    passages = []
+    for start, end, heading in merged:
+        for span_start, span_end in _split_span(text, start, end, max_chars):
+            span_start, span_end = _trim(text, span_start, span_end)
+            if span_start < span_end:
+                passages.append({"heading": heading, "start": span_start, "end": span_end})
+    return passages
+
+
+def iter_passages(
+    docs: Iterable[dict],
+    text_field: str = "content",
+    parent_field: str = "filename",
+    max_chars: int = DEFAULT_MAX_CHARS,
+    min_chars: int = DEFAULT_MIN_CHARS,
+) -> Iterator[dict]:
+    """Yield one document per passage of every input document.
+
+    Each passage carries the parent's ``parent_field`` value, its 'passage'
+    number within the parent, the 'heading' path, the 'start'/'end' character
+    offsets into the parent text, and the passage text as ``text_field``.
+    """
+    for doc in docs:
+        text = doc.get(text_field) or ""
+        for number, passage in enumerate(chunk_markdown(text, max_chars, min_chars)):
+            yield {
+                parent_field: doc.get(parent_field),
+                "passage": number,
+                "heading": passage["heading"],
+                "start": passage["start"],
+                "end": passage["end"],
+                text_field: text[passage["start"]:passage["end"]],
+            }
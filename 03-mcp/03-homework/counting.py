@@ -0,0 +1,217 @@
+"""Incremental word counting over streamed text.
+
+A counter is fed the text chunk by chunk and keeps only a short tail between
+chunks, so memory use does not depend on the length of the text. Matches that
+span a chunk boundary are counted exactly once, and the totals are the same as
+``jina_download.count_word`` over the whole text.
+
+``MultiWordCounter`` counts many words in one pass: the words are compiled
+into a single trie-shaped regex that finds, at every position where one of
+them starts, the longest word starting there. Any other word starting at that
+position is a prefix of it, so no further scanning is needed.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Iterable
+
+
+class WordCounter:
+    """Count the occurrences of a word in text fed in chunks.
+
+    Matching is case-insensitive. By default every non-overlapping substring
+    match is counted; with ``whole`` only matches at word boundaries are.
+    """
+
+    def __init__(self, word: str, whole: bool = False):
+        if not word:
+            raise ValueError("word must not be empty")
+        self.word = word
+        self.whole = whole
+        pattern = rf"\b{re.escape(word)}\b" if whole else re.escape(word)
+        self._pattern = re.compile(pattern, re.IGNORECASE)
+        self._width = len(word)
+        # Characters needed after a match (and kept before the scan position) to decide word boundaries
+        self._margin = 1 if whole else 0
+        self._buffer = ""
+        self._start = 0
+        self.count = 0
+
+    def _scan(self, buffer: str, limit: int) -> None:
+        """Count the matches of the buffer that end by ``limit`` and keep the tail that may still match."""
+        pos = self._start
+        for match in self._pattern.finditer(buffer, pos):
+            if match.end() > limit:
+                break
+            self.count += 1
+            pos = match.end()
+        # No match can start before `keep` any more: earlier ones were either counted or ruled out
+        keep = max(pos, len(buffer) - self._width - self._margin + 1)
+        cut = max(keep - self._margin, 0)
+        self._buffer = buffer[cut:]
+        self._start = keep - cut
+
+    def feed(self, chunk: str) -> None:
+        """Count the matches completed by the next chunk of text."""
+        buffer = self._buffer + chunk
+        self._scan(buffer, len(buffer) - self._margin)
+
+    def finish(self) -> int:
+        """Count the matches at the end of the text and return the total."""
+        self._scan(self._buffer, len(self._buffer))
+        self._buffer = ""
+        self._start = 0
+        return self.count
+
+
+# Key marking the end of a word in a trie node
+_END = ""
+
+# Number of spellings of matched words whose folded form is kept
+_MAX_FOLDED_MATCHES = 4096
+
+
+def _is_word_char(char: str) -> bool:
+    """Whether a character is matched by \\w (as used for \\b in count_word)."""
+    return char.isalnum() or char == "_"
+
+
+def _same_case(a: str, b: str) -> bool:
+    """Whether two characters match each other under re.IGNORECASE (as used by count_word)."""
+    return re.fullmatch(re.escape(a), b, re.IGNORECASE) is not None
+
+
+def _trie_pattern(node: dict) -> str:
+    """Regex matching the longest continuation of a trie node that ends a word."""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != _END]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{pattern})?" if _END in node else pattern
+
+
+class MultiWordCounter:
+    """Count the occurrences of many words in text fed in chunks, in one pass.
+
+    Every word is counted as ``WordCounter`` would count it on its own:
+    case-insensitive, non-overlapping matches of the same word, and with
+    ``whole`` only matches at word boundaries. Matches of different words may
+    overlap (counting 'he' and 'hello' in 'hello' finds both). Words that only
+    differ in case share their count.
+
+    Case is compared by the regex engine, like ``re.IGNORECASE`` does for
+    ``count_word``, rather than by lowercasing: it also equates characters
+    such as 'σ' and 'ς' whose lowercase forms differ.
+    """
+
+    def __init__(self, words: Iterable[str], whole: bool = False):
+        self.words = list(words)
+        if not self.words or not all(self.words):
+            raise ValueError("words must be non-empty strings")
+        self.whole = whole
+
+        # Character each character folds to: the first word character matching it under re.IGNORECASE
+        self._fold_chars: dict[str, str] = {}
+        # Folded form of the matched strings, which mostly repeat the same few spellings
+        self._fold_matches: dict[str, str] = {}
+        self._counts = {self._fold(word): 0 for word in self.words}
+        trie: dict = {}
+        for word in self._counts:
+            node = trie
+            for char in word:
+                node = node.setdefault(char, {})
+            node[_END] = word
+        self._pattern = re.compile(f"(?=({_trie_pattern(trie)}))", re.IGNORECASE)
+        # Words that match wherever a given word matches: itself and the words it starts with
+        self._prefixes = {word: [other for other in self._counts if word.startswith(other)] for word in self._counts}
+        self._width = max(len(word) for word in self._counts)
+        self._margin = 1 if whole else 0
+
+        # Absolute offset where the next match of each word may start (matches of a word do not overlap)
+        self._next_start = dict.fromkeys(self._counts, 0)
+        self._buffer = ""
+        self._start = 0
+        self._offset = 0
+
+    def _fold(self, text: str) -> str:
+        """Map every character to its folded form, so strings equal under re.IGNORECASE fold alike."""
+        folded = []
+        for char in text:
+            target = self._fold_chars.get(char)
+            if target is None:
+                known = set(self._fold_chars.values())
+                target = next((other for other in known if _same_case(other, char)), char)
+                self._fold_chars[char] = target
+            folded.append(target)
+        return "".join(folded)
+
+    def _boundary(self, buffer: str, pos: int) -> bool:
+        """Whether \\b holds at a position of the buffer (its ends count as non-word)."""
+        before = pos > 0 and _is_word_char(buffer[pos - 1])
+        after = pos < len(buffer) and _is_word_char(buffer[pos])
+        return before != after
+
+    def _count_at(self, buffer: str, start: int, longest: str) -> None:
+        """Count the words that start at a position of the buffer, given the longest of them."""
+        if self.whole and not self._boundary(buffer, start):
+            return
+        position = self._offset + start
+        folded = self._fold_matches.get(longest)
+        if folded is None:
+            if len(self._fold_matches) >= _MAX_FOLDED_MATCHES:
+                self._fold_matches.clear()
+            folded = self._fold_matches[longest] = self._fold(longest)
+        for word in self._prefixes[folded]:
+            if position < self._next_start[word]:
+                continue
+            end = start + len(word)
+            if self.whole and not self._boundary(buffer, end):
+                continue
+            self._counts[word] += 1
+            self._next_start[word] = position + len(word)
+
+    def _scan(self, buffer: str, limit: int) -> None:
+        """Count the words starting before ``limit`` and keep the rest of the buffer."""
+        for match in self._pattern.finditer(buffer, self._start):
+            if match.start() >= limit:
+                break
+            self._count_at(buffer, match.start(), match.group(1))
+        keep = max(self._start, limit)
+        cut = max(keep - self._margin, 0)
+        self._buffer = buffer[cut:]
+        self._start = keep - cut
+        self._offset += cut
+
+    def feed(self, chunk: str) -> None:
+        """Count the matches completed by the next chunk of text."""
+        buffer = self._buffer + chunk
+        # A word starting before `limit` ends (with the character deciding its boundary) inside the buffer
+        self._scan(buffer, len(buffer) - self._width - self._margin + 1)
+
+    def finish(self) -> dict[str, int]:
+        """Count the matches at the end of the text and return the count of every word."""
+        self._scan(self._buffer, len(self._buffer))
+        self._buffer = ""
+        self._start = 0
+        return self.counts
+
+    @property
+    def counts(self) -> dict[str, int]:
+        """Counts so far, keyed by the words as given."""
+        return {word: self._counts[self._fold(word)] for word in self.words}
+
+
+def count_words(text: str, words: Iterable[str], whole: bool = False) -> dict[str, int]:
+    """Count the occurrences of many words in a text in one pass; see MultiWordCounter."""
+    counter = MultiWordCounter(words, whole=whole)
+    counter.feed(text)
+    return counter.finish()
+
+
+def count_chunks(chunks: Iterable[str], word: str, whole: bool = False) -> int:
+    """Count the occurrences of a word in text given as an iterable of chunks."""
+    counter = WordCounter(word, whole=whole)
+    for chunk in chunks:
+        counter.feed(chunk)
+    return counter.finish()
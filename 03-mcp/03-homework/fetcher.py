@@ -0,0 +1,237 @@
+"""Asynchronous, connection-pooled fetching of pages for the jina_* tools.
+
+A single ``Fetcher`` keeps one ``httpx.AsyncClient`` open, so repeated calls
+reuse keep-alive connections instead of paying a TCP+TLS handshake each time.
+HTTP/2 is negotiated when the optional ``h2`` package is installed, which lets
+concurrent requests to the same host share one connection. A semaphore per host
+bounds how many requests are in flight against any single server, an optional
+rate limit spaces out request starts per host, and throttled (429), failing
+(5xx) or dropped requests can be retried with exponential backoff.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterator
+from urllib.parse import urlparse
+
+import httpx
+
+from cache import ResponseCache, normalize_url
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+USER_AGENT = "jina-downloader/1.0 (+https://github.com/)"
+
+DEFAULT_TIMEOUT = 15
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_PER_HOST = 4
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+
+# Responses worth retrying: throttling and server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+async def _iter_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Yield the items of a blocking iterator, advancing it in a worker thread."""
+    while (item := await asyncio.to_thread(next, iterator, None)) is not None:
+        yield item
+
+
+class Fetcher:
+    """Fetch pages over a shared connection pool.
+
+    Parameters
+    - timeout: seconds allowed for connecting and for each read
+    - max_connections: size of the connection pool across all hosts
+    - per_host: maximum number of requests in flight per host
+    - http2: negotiate HTTP/2 (default: when the h2 package is installed)
+    - rate: optional maximum number of requests started per second per host
+    - retries: times a request is retried after a transport error, 429 or 5xx
+    - backoff: delay before the first retry in seconds, doubled for each
+      further retry (with jitter); a Retry-After header takes precedence
+    - transport: optional httpx transport, e.g. httpx.MockTransport in tests
+
+    Use it as an async context manager, or call ``aclose`` when done. The
+    client is bound to the event loop it is first used on.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        per_host: int = DEFAULT_PER_HOST,
+        http2: bool | None = None,
+        rate: float | None = None,
+        retries: int = 0,
+        backoff: float = DEFAULT_BACKOFF,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        if per_host < 1:
+            raise ValueError("per_host must be at least 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("rate must be positive")
+        if http2 is None:
+            http2 = HTTP2_AVAILABLE
+        self.per_host = per_host
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        self.client = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=http2 and transport is None,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+            transport=transport,
+        )
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._next_start: dict[str, float] = {}
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return limit
+
+    async def _throttle(self, url: str) -> None:
+        """Wait for the next start slot of the URL's host under the rate limit."""
+        if self.rate is None:
+            return
+        host = urlparse(url).netloc
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + 1 / self.rate
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def _retry_delay(self, attempt: int, resp: httpx.Response | None) -> float:
+        """Seconds to wait before retry number ``attempt`` (from 0)."""
+        if resp is not None:
+            retry_after = resp.headers.get("retry-after", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), MAX_BACKOFF)
+        delay = min(self.backoff * 2 ** attempt, MAX_BACKOFF)
+        return delay * random.uniform(0.5, 1.0)
+
+    @asynccontextmanager
+    async def stream(
+        self, url: str, headers: dict | None = None, timeout: float | None = None
+    ) -> AsyncIterator[httpx.Response]:
+        """GET a URL and yield the response before its body is read.
+
+        Waits for a free slot of the URL's host and holds it until the block
+        exits. Requests that fail before the response headers arrive are
+        retried as configured. ``timeout`` overrides the client timeout for
+        this request. Raises httpx.HTTPStatusError on error responses; a 304
+        Not Modified answer to conditional ``headers`` is yielded as is.
+        """
+        kwargs = {} if timeout is None else {"timeout": timeout}
+        request = self.client.build_request("GET", url, headers=headers, **kwargs)
+        limit = self._host_limit(url)
+        for attempt in range(self.retries + 1):
+            resp = None
+            await limit.acquire()
+            try:
+                await self._throttle(url)
+                resp = await self.client.send(request, stream=True)
+            except httpx.TransportError:
+                limit.release()
+                if attempt == self.retries:
+                    raise
+            except BaseException:
+                limit.release()
+                raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    break
+                await resp.aclose()
+                limit.release()
+            await asyncio.sleep(self._retry_delay(attempt, resp))
+
+        try:
+            if resp.status_code != 304:
+                resp.raise_for_status()
+            yield resp
+        finally:
+            await resp.aclose()
+            limit.release()
+
+    async def get(self, url: str, headers: dict | None = None, timeout: float | None = None) -> httpx.Response:
+        """GET a URL and read the whole response; see ``stream``."""
+        async with self.stream(url, headers=headers, timeout=timeout) as resp:
+            await resp.aread()
+        return resp
+
+    async def stream_text(
+        self,
+        url: str,
+        timeout: float | None = None,
+        cache: ResponseCache | None = None,
+        key: str | None = None,
+    ) -> AsyncIterator[str]:
+        """Yield the decoded body of a URL in chunks as it arrives.
+
+        With a cache, a fresh entry under ``key`` (default: the normalized URL)
+        is read back without a request, a stale one is revalidated with a
+        conditional request, and a downloaded body is written to the cache
+        while it streams through. The body is never held in memory whole.
+        Cache lookups, blob reads and writes run in worker threads, so a slow
+        disk does not hold up the other requests on the event loop.
+        """
+        entry = None
+        if cache is not None:
+            key = key or normalize_url(url)
+            entry = await asyncio.to_thread(cache.lookup, key, load=False)
+            if entry is not None and entry["fresh"]:
+                async for chunk in _iter_in_thread(cache.iter_content(entry)):
+                    yield chunk
+                return
+
+        headers = cache.validators(entry) if cache is not None else None
+        async with self.stream(url, headers=headers, timeout=timeout) as resp:
+            if entry is not None and resp.status_code == 304:
+                await asyncio.to_thread(cache.revalidated, key)
+                async for chunk in _iter_in_thread(cache.iter_content(entry)):
+                    yield chunk
+                return
+
+            writer = await asyncio.to_thread(cache.writer, key, url) if cache is not None else None
+            try:
+                async for chunk in resp.aiter_text():
+                    if writer is not None:
+                        await asyncio.to_thread(writer.write, chunk)
+                    yield chunk
+            except BaseException:
+                if writer is not None:
+                    writer.abort()
+                raise
+            if writer is not None:
+                await asyncio.to_thread(writer.commit, resp.headers)
+
+    async def fetch_text(
+        self,
+        url: str,
+        timeout: float | None = None,
+        cache: ResponseCache | None = None,
+        key: str | None = None,
+    ) -> str:
+        """Return the decoded body of a URL; see ``stream_text``."""
+        return "".join([chunk async for chunk in self.stream_text(url, timeout=timeout, cache=cache, key=key)])
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "Fetcher":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,215 @@
+"""Read markdown documents out of the zip archives in a directory.
+
+Members of all archives are split into small batches that a thread pool
+decompresses and decodes in parallel (zlib releases the GIL), while documents
+are yielded in archive order so they can be streamed straight into
+``minsearch.Index.fit_stream``. Per-archive timings are collected in an
+optional report dict.
+
+A manifest records the CRC, size and modification time of every member, so
+two manifests can be diffed to re-ingest only the members that changed.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+MARKDOWN_SUFFIXES = (".md", ".mdx")
+
+# Members read by one task; each task opens its archive once
+MEMBERS_PER_TASK = 32
+
+MANIFEST_FILE = "manifest.json"
+
+
+def member_filename(name: str) -> str:
+    """Return the member path without its top-level directory (the archive root)."""
+    path_parts = Path(name).parts
+    if len(path_parts) > 1:
+        return str(Path(*path_parts[1:]))
+    return name
+
+
+def markdown_members(zip_path: Path) -> list[zipfile.ZipInfo]:
+    """Return the .md/.mdx file members of an archive, in archive order."""
+    with zipfile.ZipFile(zip_path, "r") as z:
+        return [
+            member for member in z.infolist()
+            if not member.is_dir() and member.filename.endswith(MARKDOWN_SUFFIXES)
+        ]
+
+
+def read_members(zip_path: Path, members: list[zipfile.ZipInfo]) -> tuple[list[dict], float, float, int]:
+    """Decompress and decode the given members of one archive.
+
+    Returns the documents, the start and end time of the work and the number
+    of uncompressed bytes read.
+    """
+    started = time.perf_counter()
+    docs = []
+    num_bytes = 0
+    with zipfile.ZipFile(zip_path, "r") as z:
+        for member in members:
+            with z.open(member) as f:
+                data = f.read()
+            num_bytes += len(data)
+            docs.append({
+                "filename": member_filename(member.filename),
+                "content": data.decode("utf-8", errors="ignore"),
+            })
+    return docs, started, time.perf_counter(), num_bytes
+
+
+def iter_zip_docs(
+    directory: str | Path = ".",
+    max_workers: int | None = None,
+    report: dict | None = None,
+    members: set[tuple[str, str]] | None = None,
+) -> Iterator[dict]:
+    """Yield a document for every markdown file in the zip archives of a directory.
+
+    Parameters
+    - directory: directory whose *.zip files are read
+    - max_workers: size of the thread pool (default: CPU count + 4, at most 32)
+    - report: optional dict filled with 'archives' (per-archive 'members',
+      'bytes', 'cpu_seconds' and 'wall_seconds') and the total 'wall_seconds'
+    - members: optional set of (archive name, member name) pairs; only these
+      members are read
+
+    Documents have 'filename' (member path without the archive root) and
+    'content' fields and come out in the same order as a serial read.
+    """
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    if report is None:
+        report = {}
+    archives = report.setdefault("archives", {})
+
+    started = time.perf_counter()
+    tasks = []
+    for zip_path in sorted(Path(directory).glob("*.zip")):
+        selected = [
+            member for member in markdown_members(zip_path)
+            if members is None or (zip_path.name, member.filename) in members
+        ]
+        if not selected and members is not None:
+            continue
+        archives[str(zip_path)] = {"members": len(selected), "bytes": 0, "cpu_seconds": 0.0, "wall_seconds": 0.0}
+        for start in range(0, len(selected), MEMBERS_PER_TASK):
+            tasks.append((zip_path, selected[start:start + MEMBERS_PER_TASK]))
+
+    # Bound the tasks in flight so memory stays proportional to the pool, not the corpus
+    spans = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        remaining = iter(tasks)
+        pending = deque()
+        for task in remaining:
+            pending.append((task[0], executor.submit(read_members, *task)))
+            if len(pending) >= 2 * max_workers:
+                break
+
+        while pending:
+            zip_path, future = pending.popleft()
+            task = next(remaining, None)
+            if task is not None:
+                pending.append((task[0], executor.submit(read_members, *task)))
+
+            docs, task_start, task_end, num_bytes = future.result()
+            stats = archives[str(zip_path)]
+            stats["bytes"] += num_bytes
+            stats["cpu_seconds"] += task_end - task_start
+            first, last = spans.get(zip_path, (task_start, task_end))
+            spans[zip_path] = (min(first, task_start), max(last, task_end))
+            stats["wall_seconds"] = spans[zip_path][1] - spans[zip_path][0]
+
+            yield from docs
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        report["wall_seconds"] = time.perf_counter() - started
+
+
+def format_report(report: dict) -> str:
+    """Return a human-readable summary of an ingestion report."""
+    lines = []
+    for path, stats in report.get("archives", {}).items():
+        lines.append(
+            f"{path}: {stats['members']} files, {stats['bytes'] / 1024 / 1024:.1f} MB, "
+            f"{stats['wall_seconds']:.2f}s wall, {stats['cpu_seconds']:.2f}s in workers"
+        )
+    lines.append(f"Read {len(report.get('archives', {}))} archives in {report.get('wall_seconds', 0.0):.2f}s")
+    return "\n".join(lines)
+
+
+def build_manifest(directory: str | Path = ".", previous: dict | None = None) -> dict:
+    """Describe the markdown members of every archive in a directory.
+
+    Each member is recorded with its CRC, uncompressed size and modification
+    time. Archives whose file size and mtime match their entry in ``previous``
+    are not reopened, so polling an unchanged directory only costs a stat per archive.
+    """
+    previous_archives = (previous or {}).get("archives", {})
+    archives = {}
+    for zip_path in sorted(Path(directory).glob("*.zip")):
+        stat = zip_path.stat()
+        known = previous_archives.get(zip_path.name)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            archives[zip_path.name] = known
+            continue
+
+        archives[zip_path.name] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "members": {
+                member.filename: {"crc": member.CRC, "size": member.file_size, "mtime": list(member.date_time)}
+                for member in markdown_members(zip_path)
+            },
+        }
+    return {"archives": archives}
+
+
+def diff_manifests(old: dict, new: dict) -> dict[str, set[tuple[str, str]]]:
+    """Compare two manifests.
+
+    Returns a dict with the 'added', 'modified' and 'removed' members, each a
+    set of (archive name, member name) pairs.
+    """
+    def entries(manifest):
+        return {
+            (archive, member): info
+            for archive, archive_info in manifest.get("archives", {}).items()
+            for member, info in archive_info["members"].items()
+        }
+
+    old_entries = entries(old)
+    new_entries = entries(new)
+    return {
+        "added": new_entries.keys() - old_entries.keys(),
+        "modified": {key for key in new_entries.keys() & old_entries.keys() if new_entries[key] != old_entries[key]},
+        "removed": old_entries.keys() - new_entries.keys(),
+    }
+
+
+def load_manifest(path: str | Path) -> dict | None:
+    """Read a manifest saved with save_manifest, or return None if there is none."""
+    try:
+        with open(Path(path, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_manifest(manifest: dict, path: str | Path) -> None:
+    """Write a manifest next to an index snapshot, replacing the previous one atomically."""
+    target = Path(path, MANIFEST_FILE)
+    tmp = target.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, target)
@@ -5,30 +5,45 @@ Usage examples:
   python jina_download.py https://datatalks.club
   python jina_download.py datatalks.club -o datatalks.md
   python jina_download.py example.com https://r.jina.ai/https://other.site -d downloads/
+  python jina_download.py -i urls.txt -d downloads/ --concurrency 16 --rate 5
 """
 
 from __future__ import annotations
 
 import argparse
+import asyncio
+import codecs
+import hashlib
+import itertools
 import os
 import sys
 import re
+import time
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
 
 import requests
 
+from cache import DEFAULT_CACHE_DIR, DEFAULT_CHUNK_SIZE, DEFAULT_MAX_BYTES, DEFAULT_TTL, ResponseCache, normalize_url
+from counting import MultiWordCounter
+from fetcher import DEFAULT_PER_HOST, USER_AGENT, Fetcher
+
+# Reader endpoint; point it at a local stub server to test without network access
+JINA_READER_URL = os.environ.get("JINA_READER_URL", "https://r.jina.ai/")
+
 
 def jina_url(original_url: str) -> str:
     """Return the r.jina.ai URL for the given page URL.
 
-    If the provided URL already starts with r.jina.ai it is returned unchanged.
-    If no scheme is present, https:// is added.
+    If the provided URL already starts with r.jina.ai (or the configured
+    JINA_READER_URL) it is returned unchanged. If no scheme is present,
+    https:// is added.
     """
-    if original_url.startswith("https://r.jina.ai/") or original_url.startswith("http://r.jina.ai/"):
+    if original_url.startswith(("https://r.jina.ai/", "http://r.jina.ai/", JINA_READER_URL)):
         return original_url
     if not original_url.startswith("http://") and not original_url.startswith("https://"):
         original_url = "https://" + original_url
-    return f"https://r.jina.ai/{original_url}"
+    return f"{JINA_READER_URL.rstrip('/')}/{original_url}"
 
 
 def filename_from_url(original_url: str) -> str:
@@ -38,11 +53,74 @@ def filename_from_url(original_url: str) -> str:
     return f"{safe}.md"
 
 
-def fetch_markdown(url: str, timeout: int = 15) -> str:
-    headers = {"User-Agent": "jina-downloader/1.0 (+https://github.com/)"}
-    resp = requests.get(url, timeout=timeout, headers=headers)
-    resp.raise_for_status()
-    return resp.text
+def open_cache(directory: str | None = None, ttl: float | None = None) -> ResponseCache:
+    """Open the response cache, configured by JINA_CACHE_DIR, JINA_CACHE_TTL and JINA_CACHE_MAX_MB by default."""
+    if directory is None:
+        directory = os.environ.get("JINA_CACHE_DIR", DEFAULT_CACHE_DIR)
+    if ttl is None:
+        ttl = float(os.environ.get("JINA_CACHE_TTL", DEFAULT_TTL))
+    max_mb = os.environ.get("JINA_CACHE_MAX_MB")
+    max_bytes = int(float(max_mb) * 1024 * 1024) if max_mb else DEFAULT_MAX_BYTES
+    return ResponseCache(directory, ttl=ttl, max_bytes=max_bytes)
+
+
+def stream_markdown(
+    url: str,
+    timeout: int = 15,
+    cache: ResponseCache | None = None,
+    key: str | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Fetch a URL and yield its text in chunks as it is downloaded.
+
+    The response is decoded incrementally, so the page is never held in
+    memory whole. With a cache, a fresh entry under ``key`` (default: the
+    normalized URL) is read back without a request, a stale one is revalidated
+    with a conditional request, and a downloaded page is written to the cache
+    as it streams through.
+    """
+    headers = {"User-Agent": USER_AGENT}
+    entry = None
+    if cache is not None:
+        key = key or normalize_url(url)
+        entry = cache.lookup(key, load=False)
+        if entry is not None and entry["fresh"]:
+            yield from cache.iter_content(entry, chunk_size)
+            return
+        headers.update(cache.validators(entry))
+
+    with requests.get(url, timeout=timeout, headers=headers, stream=True) as resp:
+        if entry is not None and resp.status_code == 304:
+            cache.revalidated(key)
+            yield from cache.iter_content(entry, chunk_size)
+            return
+        resp.raise_for_status()
+
+        decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")(errors="replace")
+        writer = cache.writer(key, url) if cache is not None else None
+        try:
+            for data in resp.iter_content(chunk_size):
+                text = decoder.decode(data)
+                if text:
+                    if writer is not None:
+                        writer.write(text)
+                    yield text
+            text = decoder.decode(b"", final=True)
+            if text:
+                if writer is not None:
+                    writer.write(text)
+                yield text
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        if writer is not None:
+            writer.commit(resp.headers)
+
+
+def fetch_markdown(url: str, timeout: int = 15, cache: ResponseCache | None = None, key: str | None = None) -> str:
+    """Fetch a URL and return its text; see stream_markdown."""
+    return "".join(stream_markdown(url, timeout=timeout, cache=cache, key=key))
 
 
 def get_char_count(text: str) -> int:
@@ -63,29 +141,212 @@ def count_word(text: str, word: str, whole: bool = False) -> int:
     return len(re.findall(pattern, text, flags=re.IGNORECASE))
 
 
+def read_url_list(path: str) -> Iterator[str]:
+    """Yield the URLs of a file, one per line; "-" reads stdin. Blank lines and # comments are skipped."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def bulk_filename(original_url: str) -> str:
+    """Return a unique output file name for a page: host and path, plus a hash of the normalized URL."""
+    key = normalize_url(original_url)
+    parsed = urlparse(key)
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{parsed.netloc}{parsed.path}").strip("_")[:80]
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:10]
+    return f"{slug}_{digest}.md"
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the nearest-rank q-th percentile (0-100) of the values, or 0.0 for none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def bulk_download(
+    urls: Iterable[str],
+    directory: str = ".",
+    concurrency: int = 8,
+    per_host: int = DEFAULT_PER_HOST,
+    rate: float | None = None,
+    retries: int = 3,
+    timeout: int = 15,
+    cache: ResponseCache | None = None,
+    force: bool = False,
+    words: list[str] | None = None,
+    whole: bool = False,
+    count_only: bool = False,
+    quiet: bool = False,
+) -> dict:
+    """Download many pages concurrently into ``directory``.
+
+    Each page is written to its bulk_filename as soon as it arrives (via a
+    temporary file, so an interrupted run never leaves partial pages). Pages
+    whose file already exists are skipped unless ``force`` is set, so running
+    the same list again resumes where a previous run stopped. At most
+    ``concurrency`` pages are fetched at once, ``per_host`` of them per host,
+    and ``rate`` limits request starts per host per second. The occurrences
+    of ``words`` are counted while each page streams in.
+
+    Returns a summary with the number of 'ok', 'skipped' and 'failed' pages,
+    'chars' and 'bytes' written, 'seconds' elapsed and the fetch 'latencies'.
+    """
+    summary = {"ok": 0, "skipped": 0, "failed": 0, "chars": 0, "bytes": 0, "latencies": []}
+    queue: asyncio.Queue = asyncio.Queue(maxsize=2 * concurrency)
+    started = time.perf_counter()
+
+    async def produce():
+        seen = set()
+        lines = iter(urls)
+        try:
+            # The URLs may be read lazily from a file or stdin, so each one is read in a worker thread
+            while (orig := await asyncio.to_thread(next, lines, None)) is not None:
+                key = normalize_url(orig)
+                if key not in seen:
+                    seen.add(key)
+                    await queue.put(orig)
+        finally:
+            # Stop the workers even if reading the URLs failed; the error is raised by `await producer`
+            for _ in range(concurrency):
+                await queue.put(None)
+
+    async def work(fetcher: Fetcher):
+        while (orig := await queue.get()) is not None:
+            out_path = os.path.join(directory, bulk_filename(orig))
+            if not force and os.path.exists(out_path):
+                summary["skipped"] += 1
+                continue
+
+            fetch_started = time.perf_counter()
+            tmp_path = out_path + ".part"
+            counter = MultiWordCounter(words, whole=whole) if words else None
+            chars = 0
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    async for chunk in fetcher.stream_text(
+                        jina_url(orig), timeout=timeout, cache=cache, key=normalize_url(orig)
+                    ):
+                        f.write(chunk)
+                        chars += len(chunk)
+                        if counter is not None:
+                            counter.feed(chunk)
+            except Exception as exc:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                summary["failed"] += 1
+                print(f"ERROR: Failed to fetch {orig!r}: {exc}", file=sys.stderr)
+                continue
+            summary["latencies"].append(time.perf_counter() - fetch_started)
+
+            os.replace(tmp_path, out_path)
+            summary["ok"] += 1
+            summary["chars"] += chars
+            summary["bytes"] += os.path.getsize(out_path)
+
+            if count_only:
+                print(f"{orig}\t{chars}", flush=True)
+            elif not quiet:
+                line = f"Saved: {out_path} ({chars} chars)"
+                if counter is not None:
+                    line += "".join(f", word '{word}' count: {count}" for word, count in counter.finish().items())
+                print(line, flush=True)
+
+    async with Fetcher(timeout=timeout, per_host=per_host, rate=rate, retries=retries) as fetcher:
+        producer = asyncio.create_task(produce())
+        await asyncio.gather(*(work(fetcher) for _ in range(concurrency)))
+        await producer
+
+    summary["seconds"] = time.perf_counter() - started
+    return summary
+
+
+def format_summary(summary: dict) -> str:
+    """Return a human-readable throughput and latency summary of a bulk download."""
+    seconds = summary["seconds"] or 1e-9
+    latencies = summary["latencies"]
+    return (
+        f"{summary['ok']} downloaded, {summary['skipped']} skipped, {summary['failed']} failed "
+        f"in {summary['seconds']:.2f}s ({summary['ok'] / seconds:.1f} pages/s, "
+        f"{summary['bytes'] / 1024 / 1024 / seconds:.2f} MB/s); latency "
+        f"p50 {percentile(latencies, 50):.3f}s, p95 {percentile(latencies, 95):.3f}s, "
+        f"max {max(latencies, default=0.0):.3f}s"
+    )
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Download webpage content (markdown) via https://r.jina.ai/ (uses requests)."
     )
-    parser.add_argument("urls", nargs="+", help="One or more page URLs (with or without http(s) scheme).")
+    parser.add_argument("urls", nargs="*", help="One or more page URLs (with or without http(s) scheme).")
     parser.add_argument("-o", "--output", help="Output file (for single URL) or prefix (for multiple URLs). If omitted, content is printed to stdout and the character count is shown on the last line.")
     parser.add_argument("-d", "--dir", default=".", help="Output directory (default: current dir)")
     parser.add_argument("-q", "--quiet", action="store_true", help="Suppress status messages")
     parser.add_argument("--count-only", action="store_true", help="Print only the character count (integer) for each URL and no other output")
     parser.add_argument("--word", help="Count occurrences of this word (case-insensitive substring match by default)")
-    parser.add_argument("--whole-word", action="store_true", help="When used with --word, match whole words only")
+    parser.add_argument("--words", help="Comma-separated words to count in a single pass over the page (same matching as --word)")
+    parser.add_argument("--whole-word", action="store_true", help="When used with --word or --words, match whole words only")
+    parser.add_argument("--cache-dir", help=f"Response cache directory (default: $JINA_CACHE_DIR or {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--ttl", type=float, help=f"Seconds a cached page is used without revalidation (default: $JINA_CACHE_TTL or {DEFAULT_TTL})")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages and do not store them")
+    parser.add_argument("--cache-stats", action="store_true", help="Print response cache statistics to stderr when done")
+    bulk = parser.add_argument_group("bulk mode", "Download a list of URLs concurrently into --dir, one file per page")
+    bulk.add_argument("-i", "--input", help="File with one URL per line ('-' for stdin); enables bulk mode")
+    bulk.add_argument("--concurrency", type=int, default=8, help="Pages fetched at once (default: 8)")
+    bulk.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help=f"Requests in flight per host (default: {DEFAULT_PER_HOST})")
+    bulk.add_argument("--rate", type=float, help="Maximum requests started per second per host")
+    bulk.add_argument("--retries", type=int, default=3, help="Retries after errors, 429 or 5xx responses (default: 3)")
+    bulk.add_argument("--force", action="store_true", help="Download pages again even if their file exists")
     args = parser.parse_args()
+    if not args.urls and not args.input:
+        parser.error("give at least one URL or --input")
+    words = ([args.word] if args.word is not None else []) + ([word.strip() for word in args.words.split(",")] if args.words else [])
+    if not all(words):
+        parser.error("words to count must not be empty")
 
     os.makedirs(args.dir, exist_ok=True)
+    cache = None if args.no_cache else open_cache(args.cache_dir, args.ttl)
 
-    for i, orig in enumerate(args.urls):
-        target = jina_url(orig)
+    if args.input:
         try:
-            md = fetch_markdown(target)
-        except requests.RequestException as exc:
-            print(f"ERROR: Failed to fetch {orig!r}: {exc}", file=sys.stderr)
-            continue
+            summary = asyncio.run(bulk_download(
+                itertools.chain(args.urls, read_url_list(args.input)),
+                directory=args.dir,
+                concurrency=args.concurrency,
+                per_host=args.per_host,
+                rate=args.rate,
+                retries=args.retries,
+                cache=cache,
+                force=args.force,
+                words=words,
+                whole=args.whole_word,
+                count_only=args.count_only,
+                quiet=args.quiet,
+            ))
+        except OSError as exc:
+            print(f"ERROR: {exc}", file=sys.stderr)
+            sys.exit(1)
+        if not args.quiet:
+            print(format_summary(summary), file=sys.stderr)
+        if cache is not None:
+            if args.cache_stats:
+                print(f"Cache: {cache.stats()}", file=sys.stderr)
+            cache.close()
+        if summary["failed"]:
+            sys.exit(1)
+        return
 
+    for i, orig in enumerate(args.urls):
+        target = jina_url(orig)
+        out_path = None
         if args.output:
             if len(args.urls) == 1:
                 out_name = args.output
@@ -93,35 +354,63 @@ def main() -> None:
                 base, ext = os.path.splitext(args.output)
                 out_name = f"{base}_{i+1}{ext or '.md'}"
             out_path = os.path.join(args.dir, out_name)
-            with open(out_path, "w", encoding="utf-8") as f:
-                f.write(md)
-            count = get_char_count(md)
+
+        # Stream the page to the file (or stdout) while counting, so it is never held in memory
+        counter = MultiWordCounter(words, whole=args.whole_word) if words else None
+        count = 0
+        ends_with_newline = False
+        try:
+            out = open(out_path + ".part", "w", encoding="utf-8") if out_path else None
+            try:
+                for chunk in stream_markdown(target, cache=cache, key=normalize_url(orig)):
+                    count += len(chunk)
+                    if counter is not None:
+                        counter.feed(chunk)
+                    if out is not None:
+                        out.write(chunk)
+                    elif not args.count_only:
+                        sys.stdout.write(chunk)
+                    ends_with_newline = chunk.endswith("\n")
+            finally:
+                if out is not None:
+                    out.close()
+        except requests.RequestException as exc:
+            if out_path:
+                os.remove(out_path + ".part")
+            print(f"ERROR: Failed to fetch {orig!r}: {exc}", file=sys.stderr)
+            continue
+
+        if out_path:
+            os.replace(out_path + ".part", out_path)
             if args.count_only:
                 # Print only the integer count
                 print(count)
                 continue
             if not args.quiet:
                 print(f"Saved: {out_path} ({count} chars)")
-            if args.word and not args.quiet:
-                wcount = count_word(md, args.word, whole=args.whole_word)
-                print(f"Word '{args.word}' count: {wcount}")
+            if counter is not None and not args.quiet:
+                for word, wcount in counter.finish().items():
+                    print(f"Word '{word}' count: {wcount}")
         else:
-            # Print markdown to stdout unless count-only is requested
-            if not args.count_only:
-                print(md, end="" if md.endswith("\n") else "\n")
-            count = get_char_count(md)
+            if not args.count_only and not ends_with_newline:
+                print()
             if args.count_only:
                 # Print only the integer count
                 print(count)
             else:
                 print(f"Character count: {count}")
-                if args.word:
-                    wcount = count_word(md, args.word, whole=args.whole_word)
-                    print(f"Word '{args.word}' count: {wcount}")
+                if counter is not None:
+                    for word, wcount in counter.finish().items():
+                        print(f"Word '{word}' count: {wcount}")
             # Separate multiple outputs for readability
             if i != len(args.urls) - 1:
                 print()
 
+    if cache is not None:
+        if args.cache_stats:
+            print(f"Cache: {cache.stats()}", file=sys.stderr)
+        cache.close()
+
 
 if __name__ == "__main__":
     main()
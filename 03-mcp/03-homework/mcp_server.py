@@ -1,60 +1,398 @@
 from fastmcp import FastMCP
+import asyncio
+import json
 import os
-import zipfile
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any, NotRequired, TypedDict
 import minsearch
+from chunking import iter_passages
+from fetcher import Fetcher
+from metrics import Metrics, MetricsMiddleware, start_exporter
+from ingest import (
+    build_manifest,
+    diff_manifests,
+    format_report,
+    iter_zip_docs,
+    load_manifest,
+    member_filename,
+    save_manifest,
+)
 
 # Reuse the downloader helpers
-from jina_download import jina_url, fetch_markdown, get_char_count, count_word
+from cache import normalize_url
+from counting import MultiWordCounter, WordCounter
+from jina_download import jina_url, open_cache
 
-mcp = FastMCP("Demo 🚀")
+
+@asynccontextmanager
+async def lifespan(server):
+    """Start building the search index and watching the zips in the background as soon as the server starts."""
+    if METRICS_FILE:
+        start_exporter(metrics, METRICS_FILE, METRICS_INTERVAL)
+    start_warmup()
+    start_watcher()
+    try:
+        yield
+    finally:
+        await close_fetcher()
+
+
+mcp = FastMCP("Demo 🚀", lifespan=lifespan)
+
+# Tool call and index build metrics, see the server_metrics tool and the metrics:// resources
+metrics = Metrics()
+mcp.add_middleware(MetricsMiddleware(metrics))
+
+# Optional file the Prometheus metrics are written to every MCP_METRICS_INTERVAL seconds
+METRICS_FILE = os.environ.get("MCP_METRICS_FILE")
+METRICS_INTERVAL = float(os.environ.get("MCP_METRICS_INTERVAL", "15"))
 
 # Global index variable to cache the search index
 _index = None
 
+# Background build state: at most one build runs at a time and every caller waits on it
+_build_lock = threading.Lock()
+_build_done = threading.Event()
+_build_started = None
+_build_status = {
+    "state": "idle", "source": None, "documents": 0, "passages": 0, "error": None, "seconds": None,
+    "last_reindex": None,
+}
+
+# Manifest of the zip members the live index was built from; changes are applied against it
+_manifest = None
+_reindex_lock = threading.Lock()
+_watcher = None
+
+# Optional directory with a saved index snapshot (see minsearch.Index.save)
+INDEX_PATH = os.environ.get("MCP_INDEX_PATH")
+
+# Maximum passage length in characters; documents are indexed as passages of at most this size
+PASSAGE_MAX_CHARS = int(os.environ.get("MCP_PASSAGE_MAX_CHARS", "2000"))
+
+# Query results kept in the search index's LRU cache, whether it was built or loaded from a snapshot
+INDEX_CACHE_SIZE = 1024
+
+# Fields of a passage returned by the search tool
+PASSAGE_FIELDS = ["filename", "heading", "start", "end", "content"]
+
+# Fields the passages are indexed by; snapshots indexed differently are rebuilt
+INDEX_TEXT_FIELDS = ["content", "heading"]
+INDEX_KEYWORD_FIELDS = ["filename"]
+INDEX_ID_FIELD = "filename"
+
+# Default number of passages per query of the search tools
+DEFAULT_NUM_RESULTS = 5
+
+# Seconds between checks of the zips for changes; 0 disables live reindexing
+REINDEX_INTERVAL = float(os.environ.get("MCP_REINDEX_INTERVAL", "30"))
+
+# Shared HTTP client of the jina_* tools, created on first use
+_fetcher = None
+
+# Maximum concurrent requests per host from the jina_* tools
+FETCH_PER_HOST = int(os.environ.get("MCP_FETCH_PER_HOST", "4"))
+
+# Response cache of the jina_* tools (see jina_download.open_cache); MCP_FETCH_CACHE=0 disables it
+FETCH_CACHE = os.environ.get("MCP_FETCH_CACHE", "1") != "0"
+_cache = None
+
+def _update_status(**fields):
+    with _build_lock:
+        _build_status.update(fields)
+
+
+def _count_progress(items, key):
+    """Pass items through while counting them in the build status under `key`."""
+    for item in items:
+        with _build_lock:
+            _build_status[key] += 1
+        yield item
+
+
+def build_index(done: threading.Event):
+    """Load the index snapshot or build the index from the zips; runs on the warm-up thread.
+
+    A snapshot saved with a manifest is brought up to date by re-ingesting only the
+    zip members that changed since it was saved.
+    """
+    global _index, _manifest
+    started = time.monotonic()
+    try:
+        manifest = build_manifest()
+        index = None
+        if INDEX_PATH and Path(INDEX_PATH, "meta.json").exists():
+            _update_status(source="snapshot")
+            try:
+                index = load_snapshot(manifest)
+            except Exception as exc:
+                print(f"Could not update the index snapshot, rebuilding it: {exc}", file=sys.stderr)
+
+        if index is None:
+            _update_status(source="zips")
+            # Initialize and fit minsearch index over the passages of every document
+            index = minsearch.Index(
+                text_fields=INDEX_TEXT_FIELDS,
+                keyword_fields=INDEX_KEYWORD_FIELDS,
+                id_field=INDEX_ID_FIELD,
+                cache_size=INDEX_CACHE_SIZE
+            )
+            report = {}
+            docs = _count_progress(iter_zip_docs(report=report), "documents")
+            index.fit_stream(_count_progress(iter_passages(docs, max_chars=PASSAGE_MAX_CHARS), "passages"))
+            # stdout carries the MCP protocol, so the ingestion report goes to stderr
+            print(format_report(report), file=sys.stderr)
+            metrics.observe("ingest_seconds", report["wall_seconds"])
+            metrics.inc("ingest_bytes_total", sum(stats["bytes"] for stats in report["archives"].values()))
+            if INDEX_PATH:
+                index.save(INDEX_PATH)
+                save_manifest(manifest, INDEX_PATH)
+    except Exception as exc:
+        _update_status(state="failed", error=str(exc), seconds=time.monotonic() - started)
+        metrics.inc("index_build_errors_total")
+        print(f"Index build failed: {exc}", file=sys.stderr)
+    else:
+        _manifest = manifest
+        _index = index
+        _update_status(state="ready", passages=len(index.docs), seconds=time.monotonic() - started)
+        metrics.observe("index_build_seconds", time.monotonic() - started, source=_build_status["source"])
+        metrics.set("index_passages", len(index.docs))
+    finally:
+        done.set()
+
+
+def load_snapshot(manifest: dict):
+    """Load the index snapshot and apply the zip changes since it was saved.
+
+    Snapshots saved without a manifest are assumed to match the current zips.
+    Raises ValueError if the snapshot indexes other fields than this server
+    (e.g. whole documents from an earlier version), so that it is rebuilt.
+    """
+    index = minsearch.Index.load(INDEX_PATH, mmap=True, cache_size=INDEX_CACHE_SIZE)
+    schema = (index.text_fields, index.keyword_fields, index.id_field)
+    if schema != (INDEX_TEXT_FIELDS, INDEX_KEYWORD_FIELDS, INDEX_ID_FIELD):
+        raise ValueError(
+            "the snapshot is indexed by text_fields={}, keyword_fields={}, id_field={!r}, not as passages".format(*schema)
+        )
+    missing = [field for field in PASSAGE_FIELDS if field not in index.docs.fields]
+    if missing:
+        raise ValueError(f"the snapshot's documents have no {', '.join(missing)} field")
+    saved_manifest = load_manifest(INDEX_PATH)
+    if saved_manifest is not None:
+        updated, _ = apply_changes(index, saved_manifest, manifest)
+        # Only rewrite the snapshot when the index changed (e.g. not for added empty members)
+        if updated is not index:
+            updated.save(INDEX_PATH)
+            index = updated
+    save_manifest(manifest, INDEX_PATH)
+    return index
+
+
+def apply_changes(index, old_manifest: dict, new_manifest: dict):
+    """Re-ingest the zip members that differ between two manifests.
+
+    Changes are applied to a copy of the index, so the given index keeps serving
+    searches unchanged. Returns the updated index (the given one if nothing changed)
+    and the diff of the manifests.
+    """
+    changes = diff_manifests(old_manifest, new_manifest)
+    if not any(changes.values()):
+        return index, changes
+
+    # Passages are keyed by filename, which members of different archives can share:
+    # removing a stale filename also drops the passages of the unchanged members with
+    # that filename, so they are re-ingested along with the added and modified ones
+    stale = {member_filename(member) for _, member in changes["modified"] | changes["removed"]}
+    fresh = changes["added"] | changes["modified"] | {
+        (archive, member)
+        for archive, archive_info in new_manifest["archives"].items()
+        for member in archive_info["members"]
+        if member_filename(member) in stale
+    }
+    passages = list(iter_passages(iter_zip_docs(members=fresh), max_chars=PASSAGE_MAX_CHARS)) if fresh else []
+    if not stale and not passages:
+        return index, changes
+
+    updated = index.copy()
+    if stale:
+        updated.remove(sorted(stale))
+    if passages:
+        updated.add(passages)
+    return updated, changes
+
+
+def reindex() -> dict | None:
+    """Apply the changes of the zips since the last build or reindex to the live index.
+
+    The updated index replaces the live one in a single assignment, so searches in
+    flight finish on the index they started with and are never blocked. Returns the
+    number of 'added', 'modified' and 'removed' members, or None before the first build.
+    """
+    global _index, _manifest
+    with _reindex_lock:
+        if _index is None or _manifest is None:
+            return None
+
+        started = time.monotonic()
+        manifest = build_manifest(previous=_manifest)
+        updated, changes = apply_changes(_index, _manifest, manifest)
+        counts = {kind: len(members) for kind, members in changes.items()}
+        if updated is not _index:
+            metrics.observe("reindex_seconds", time.monotonic() - started)
+            for kind, count in counts.items():
+                metrics.inc("reindex_members_total", count, change=kind)
+            metrics.set("index_passages", len(updated.docs))
+            _index = updated
+            _update_status(
+                passages=len(updated.docs),
+                last_reindex=dict(counts, seconds=time.monotonic() - started, at=time.time()),
+            )
+            print(f"Reindexed zips: {counts}", file=sys.stderr)
+        _manifest = manifest
+        return counts
+
+
+def watch_zips(interval: float):
+    """Poll the zips for changes every `interval` seconds; runs on a daemon thread."""
+    while True:
+        time.sleep(interval)
+        try:
+            reindex()
+        except Exception as exc:
+            metrics.inc("reindex_errors_total")
+            print(f"Reindex failed: {exc}", file=sys.stderr)
+
+
+def start_watcher():
+    """Start polling the zips for changes unless disabled or already running."""
+    global _watcher
+    with _reindex_lock:
+        if REINDEX_INTERVAL > 0 and _watcher is None:
+            _watcher = threading.Thread(target=watch_zips, args=(REINDEX_INTERVAL,), name="zip-watcher", daemon=True)
+            _watcher.start()
+
+
+def start_warmup() -> threading.Event:
+    """Start the background index build unless one is running or finished.
+
+    A failed build is started again. Returns the event set when the current build ends.
+    """
+    global _build_done, _build_started
+    with _build_lock:
+        if _build_status["state"] in ("idle", "failed"):
+            _build_done = threading.Event()
+            _build_started = time.monotonic()
+            _build_status.update(state="building", source=None, documents=0, passages=0, error=None, seconds=None)
+            threading.Thread(target=build_index, args=(_build_done,), name="index-warmup", daemon=True).start()
+        return _build_done
+
+
 def get_index():
-    """Lazily load and return the search index."""
-    global _index
+    """Return the search index, waiting for the background build (and starting it if needed)."""
     if _index is not None:
         return _index
-        
-    docs = []
-    # Iterate over all zip files in current directory
-    for zip_path in Path('.').glob('*.zip'):
-        with zipfile.ZipFile(zip_path, 'r') as z:
-            for member in z.infolist():
-                if member.is_dir():
-                    continue
-                
-                # Check for .md or .mdx extensions
-                if member.filename.endswith(('.md', '.mdx')):
-                    # Remove the first part of the path
-                    path_parts = Path(member.filename).parts
-                    if len(path_parts) > 1:
-                        filename = str(Path(*path_parts[1:]))
-                    else:
-                        filename = member.filename
-                    
-                    # Read content
-                    with z.open(member) as f:
-                        content = f.read().decode('utf-8', errors='ignore')
-                    
-                    docs.append({
-                        "filename": filename,
-                        "content": content
-                    })
-    
-    # Initialize and fit minsearch index
-    _index = minsearch.Index(
-        text_fields=["content"],
-        keyword_fields=["filename"]
-    )
-    _index.fit(docs)
+
+    start_warmup().wait()
+    if _index is None:
+        raise RuntimeError(f"Index build failed: {_build_status['error']}")
     return _index
 
 
+def build_status() -> dict:
+    """Return a copy of the index build status, with the elapsed time of a running build."""
+    with _build_lock:
+        status = dict(_build_status)
+        if status["state"] == "building":
+            status["seconds"] = time.monotonic() - _build_started
+    status["ready"] = status["state"] == "ready"
+    return status
+
+
+def get_fetcher() -> Fetcher:
+    """Return the shared fetcher, so every jina_* call reuses its pooled connections."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher(per_host=FETCH_PER_HOST)
+    return _fetcher
+
+
+async def close_fetcher():
+    """Close the shared fetcher's connections and the response cache."""
+    global _fetcher, _cache
+    if _fetcher is not None:
+        await _fetcher.aclose()
+        _fetcher = None
+    if _cache is not None:
+        _cache.close()
+        _cache = None
+
+
+def get_cache():
+    """Return the shared response cache, or None when it is disabled."""
+    global _cache
+    if FETCH_CACHE and _cache is None:
+        _cache = open_cache()
+    return _cache
+
+
+def stream_page(url: str, timeout: int):
+    """Stream the markdown of a page through the reader in chunks, using the response cache."""
+    return get_fetcher().stream_text(jina_url(url), timeout=timeout, cache=get_cache(), key=normalize_url(url))
+
+
+def json_size(value) -> int:
+    """Return the size in bytes of the JSON encoding of a value."""
+    return len(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def truncate_passage(passage: dict, max_bytes: int) -> dict | None:
+    """Return the passage with its content cut so its JSON encoding fits in max_bytes.
+
+    Returns None if it does not fit even with an empty content.
+    """
+    content = passage["content"]
+    low, high = 0, len(content)
+    if json_size(dict(passage, content="", truncated=True)) > max_bytes:
+        return None
+    # Longest prefix of the content that fits
+    while low < high:
+        middle = (low + high + 1) // 2
+        if json_size(dict(passage, content=content[:middle], truncated=True)) <= max_bytes:
+            low = middle
+        else:
+            high = middle - 1
+    return dict(passage, content=content[:low], truncated=True)
+
+
+def fit_budget(passages: list[dict], max_bytes: int) -> list[dict]:
+    """Keep the leading passages whose JSON encoding fits in max_bytes.
+
+    If not even the first passage fits, its content is cut down (and the passage
+    marked 'truncated') so that one passage is still returned.
+    """
+    kept = []
+    used = 2  # enclosing brackets of the list
+    for passage in passages:
+        size = json_size(passage) + (2 if kept else 0)  # ", " separator
+        if used + size <= max_bytes:
+            kept.append(passage)
+            used += size
+            continue
+
+        if not kept:
+            truncated = truncate_passage(passage, max_bytes - used)
+            if truncated is not None:
+                kept.append(truncated)
+        break
+    return kept
+
+
 @mcp.tool
-def jina_fetch_keyword_search(url: str, word: str, whole_word: bool = False, timeout: int = 15) -> dict:
+async def jina_fetch_keyword_search(url: str, word: str, whole_word: bool = False, timeout: int = 15) -> dict:
     """Fetch page markdown via https://r.jina.ai and count occurrences of a keyword.
 
     Parameters
@@ -65,21 +403,57 @@ def jina_fetch_keyword_search(url: str, word: str, whole_word: bool = False, tim
 
     Returns a dict with 'word_count' and 'url'.
     """
-    target = jina_url(url)
     try:
-        md = fetch_markdown(target, timeout=timeout)
+        # Count while the page streams in, so large pages are never held in memory
+        counter = WordCounter(word, whole=whole_word)
+        async for chunk in stream_page(url, timeout):
+            counter.feed(chunk)
     except Exception as exc:
+        # Returned as a result, so the middleware does not see it as an error
+        metrics.inc("tool_errors_total", tool="jina_fetch_keyword_search")
         return {"error": str(exc)}
 
     return {
         "url": url,
         "word": word,
-        "word_count": count_word(md, word, whole=whole_word)
+        "word_count": counter.finish()
     }
 
 
 @mcp.tool
-def jina_fetch_total_chars(url: str, timeout: int = 15) -> dict:
+async def jina_fetch_keyword_counts(url: str, words: list[str], whole_word: bool = False, timeout: int = 15) -> dict:
+    """Fetch page markdown via https://r.jina.ai once and count occurrences of several keywords.
+
+    Prefer this over calling jina_fetch_keyword_search once per word: the page
+    is fetched once and all words are counted in a single pass.
+
+    Parameters
+    - url: original page URL
+    - words: the words to count (case-insensitive)
+    - whole_word: if True, count only whole-word matches
+    - timeout: request timeout in seconds
+
+    Returns a dict with 'url', 'word_counts' (word -> count) and 'char_count'.
+    """
+    char_count = 0
+    try:
+        counter = MultiWordCounter(words, whole=whole_word)
+        async for chunk in stream_page(url, timeout):
+            counter.feed(chunk)
+            char_count += len(chunk)
+    except Exception as exc:
+        metrics.inc("tool_errors_total", tool="jina_fetch_keyword_counts")
+        return {"error": str(exc)}
+
+    return {
+        "url": url,
+        "word_counts": counter.finish(),
+        "char_count": char_count
+    }
+
+
+@mcp.tool
+async def jina_fetch_total_chars(url: str, timeout: int = 15) -> dict:
     """Fetch page markdown via https://r.jina.ai and return the total character count.
 
     Parameters
@@ -88,36 +462,172 @@ def jina_fetch_total_chars(url: str, timeout: int = 15) -> dict:
 
     Returns a dict with 'char_count' and 'url'.
     """
-    target = jina_url(url)
+    char_count = 0
     try:
-        md = fetch_markdown(target, timeout=timeout)
+        async for chunk in stream_page(url, timeout):
+            char_count += len(chunk)
     except Exception as exc:
+        metrics.inc("tool_errors_total", tool="jina_fetch_total_chars")
         return {"error": str(exc)}
 
     return {
         "url": url,
-        "char_count": get_char_count(md)
+        "char_count": char_count
     }
 
 
 @mcp.tool
-def search(query: str, num_results: int = 5) -> list[dict]:
-    """Search for relevant documents in the indexed fastmcp documentation.
+def jina_cache_stats() -> dict:
+    """Report the statistics of the page cache used by the jina_* tools.
+
+    Returns a dict with the 'hits', 'misses', 'stale' lookups, 'revalidated' and
+    'stored' pages, 'evicted' entries and 'hit_rate' since the server started,
+    plus the number of 'entries' and the 'bytes' they take on disk. Returns
+    {'enabled': False} when the cache is disabled.
+    """
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return dict(cache.stats(), enabled=True)
+
+
+@mcp.tool
+async def search(query: str, num_results: int = DEFAULT_NUM_RESULTS, max_bytes: int | None = None) -> list[dict]:
+    """Search for relevant passages in the indexed fastmcp documentation.
+
+    Documents are indexed as heading-bounded passages, so each result is one
+    section of a markdown file rather than the whole file.
 
     Parameters
     - query: The search query string
-    - num_results: Number of top results to return (default 5)
-    
-    Returns a list of matching documents with 'filename' and 'content' fields.
+    - num_results: Number of top passages to return (default 5)
+    - max_bytes: Optional budget for the JSON size of the result; lower-ranked
+      passages that do not fit are dropped
+
+    Returns a list of passages with 'filename', 'heading', 'start', 'end' (character
+    offsets in the file) and 'content' fields. While the index is still being
+    built, the call waits for that build to finish.
     """
-    index = get_index()
-    results = index.search(
+    # Wait off the event loop so other tools keep running during warm-up
+    index = await asyncio.to_thread(get_index)
+    # Scoring runs off the event loop too, so a slow query does not hold up concurrent jina_* fetches
+    results = await asyncio.to_thread(
+        index.search,
         query=query,
-        num_results=num_results
+        num_results=num_results,
+        output_fields=PASSAGE_FIELDS,
     )
+    if max_bytes is not None:
+        results = fit_budget(results, max_bytes)
     return results
 
 
+class SearchQuery(TypedDict):
+    """One query of a search_many call."""
+    query: str
+    num_results: NotRequired[int]
+    filter: NotRequired[dict[str, Any]]
+
+
+def dedupe_results(docs, batches: list) -> dict:
+    """Replace the passages of several result lists by references into one list of unique passages.
+
+    `batches` holds the ranked document ids of every query (see Index.search_batch_ids).
+    Passages are identified by these ids rather than by filename and offset, which
+    passages of different archives can share, and each unique passage is read from
+    `docs` once. Returns a dict with the unique 'documents' and, per query, the
+    'results' as indices into them.
+    """
+    documents = []
+    refs = {}
+    results = []
+    for doc_ids in batches:
+        row = []
+        for doc_id in doc_ids.tolist():
+            if doc_id not in refs:
+                refs[doc_id] = len(documents)
+                documents.append(docs.get(doc_id, PASSAGE_FIELDS))
+            row.append(refs[doc_id])
+        results.append(row)
+    return {"documents": documents, "results": results}
+
+
+@mcp.tool
+async def search_many(queries: list[SearchQuery]) -> dict:
+    """Run several searches over the indexed fastmcp documentation in one call.
+
+    Prefer this over consecutive search calls: all queries are scored together
+    and a passage found by several queries is returned only once.
+
+    Parameters
+    - queries: list of queries, each a dict with
+      - query: the search query string
+      - num_results: number of top passages for this query (default 5)
+      - filter: optional keyword filter, e.g. {"filename": "docs/servers/tools.mdx"};
+        a list of values matches any of them and {"not": value} excludes a value
+
+    Returns a dict with 'documents', the unique passages found (with 'filename',
+    'heading', 'start', 'end' and 'content'), and 'results', one list per query
+    (in the order given) of indices into 'documents', best match first.
+    """
+    index = await asyncio.to_thread(get_index)
+    if not queries:
+        return {"documents": [], "results": []}
+
+    limits = [query.get("num_results", DEFAULT_NUM_RESULTS) for query in queries]
+    # The top results for a smaller limit are a prefix of those for the largest one
+    batches = await asyncio.to_thread(
+        index.search_batch_ids,
+        [query["query"] for query in queries],
+        filter_dicts=[query.get("filter") for query in queries],
+        num_results=max(limits),
+    )
+    return dedupe_results(index.docs, [doc_ids[:max(limit, 0)] for limit, doc_ids in zip(limits, batches)])
+
+
+@mcp.tool
+def index_status() -> dict:
+    """Report the progress of the search index build.
+
+    Returns a dict with 'state' ('idle', 'building', 'ready' or 'failed'), 'ready',
+    'source' ('snapshot' or 'zips'), the number of 'documents' read and 'passages'
+    indexed so far, 'seconds' spent building, the build 'error' if it failed and
+    'last_reindex' with the members added, modified and removed by the last live update.
+    """
+    return build_status()
+
+
+@mcp.resource("index://status", mime_type="application/json")
+def index_status_resource() -> dict:
+    """Progress of the search index build (same as the index_status tool)."""
+    return build_status()
+
+
+@mcp.tool
+def server_metrics() -> dict:
+    """Report the server's performance metrics.
+
+    Returns a dict with, per tool, the number of calls ('tool_calls_total'),
+    calls that failed ('tool_errors_total'), latency ('tool_latency_seconds' with
+    'count', 'mean', 'max', 'p50', 'p95' and 'p99' in seconds) and argument / result
+    sizes in bytes, plus index build, ingest and reindex timings and the
+    'uptime_seconds'.
+    """
+    return metrics.snapshot()
+
+
+@mcp.resource("metrics://snapshot", mime_type="application/json")
+def metrics_resource() -> dict:
+    """Performance metrics of the server (same as the server_metrics tool)."""
+    return metrics.snapshot()
+
+
+@mcp.resource("metrics://prometheus", mime_type="text/plain")
+def metrics_prometheus() -> str:
+    """Performance metrics of the server in the Prometheus text exposition format."""
+    return metrics.prometheus()
+
+
 if __name__ == "__main__":
     mcp.run()
 
@@ -0,0 +1,258 @@
+"""Low-overhead metrics for FastMCP servers.
+
+``Metrics`` keeps counters, gauges and fixed-bucket histograms in memory,
+keyed by name and labels. Recording a value costs a lock and a bisect, so the
+registry can stay on in production. ``MetricsMiddleware`` records the call
+count, errors, latency and payload sizes of every tool call of a server.
+
+Metrics are read back as a dict (``snapshot``, with latency quantiles
+estimated from the histogram buckets) or in the Prometheus text exposition
+format (``prometheus``), which ``start_exporter`` can also write to a file
+for the node_exporter textfile collector.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """Counts of observed values per bucket, plus their sum, minimum and maximum."""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimate a quantile by linear interpolation inside its bucket, like Prometheus' histogram_quantile.
+
+        The estimate is clamped to the observed minimum and maximum.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        estimate = self.max
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i < len(self.bounds):
+                    lower = self.bounds[i - 1] if i else 0.0
+                    estimate = lower + (self.bounds[i] - lower) * (rank - seen) / count
+                break
+            seen += count
+        return min(max(estimate, self.min), self.max)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metrics:
+    """Registry of counters, gauges and histograms, safe to update from any thread.
+
+    Parameters
+    - prefix: prepended (with an underscore) to every metric name on export
+    - buckets: upper bounds of the histogram buckets
+    """
+
+    def __init__(self, prefix: str = "mcp", buckets=LATENCY_BUCKETS):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._types: dict[str, str] = {}
+        self._help: dict[str, str] = {}
+        self._values: dict[str, dict[tuple, Any]] = {}
+
+    def _series(self, name: str, kind: str) -> dict:
+        known = self._types.setdefault(name, kind)
+        if known != kind:
+            raise ValueError(f"metric {name!r} is a {known}, not a {kind}")
+        return self._values.setdefault(name, {})
+
+    def describe(self, name: str, help_text: str) -> None:
+        """Set the HELP text of a metric."""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series(name, "counter")
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge."""
+        with self._lock:
+            self._series(name, "gauge")[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a value in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series(name, "histogram")
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Record the duration of a block in seconds in a histogram, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> dict:
+        """Return every metric as a dict.
+
+        Counters and gauges map to their value, or to a list of {'labels', 'value'}
+        when labelled. Histograms report 'count', 'sum', 'mean', 'max' and
+        estimated 'p50', 'p95' and 'p99'.
+        """
+        with self._lock:
+            result = {"uptime_seconds": time.time() - self.started}
+            for name, series in self._values.items():
+                entries = []
+                for key, value in series.items():
+                    if isinstance(value, Histogram):
+                        value = {
+                            "count": value.count,
+                            "sum": value.sum,
+                            "mean": value.sum / value.count if value.count else None,
+                            "max": value.max if value.count else None,
+                            **{f"p{round(q * 100)}": value.quantile(q) for q in QUANTILES},
+                        }
+                    entries.append({"labels": dict(key), "value": value})
+                if len(entries) == 1 and not entries[0]["labels"]:
+                    result[name] = entries[0]["value"]
+                else:
+                    result[name] = entries
+        return result
+
+    def prometheus(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._values.items()):
+                full_name = f"{self.prefix}_{name}" if self.prefix else name
+                if name in self._help:
+                    lines.append(f"# HELP {full_name} {self._help[name]}")
+                lines.append(f"# TYPE {full_name} {self._types[name]}")
+                for key, value in sorted(series.items()):
+                    if not isinstance(value, Histogram):
+                        lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.bounds + (float("inf"),), value.counts):
+                        cumulative += count
+                        le = (("le", _format_value(bound)),)
+                        lines.append(f"{full_name}_bucket{_format_labels(key, le)} {cumulative}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {_format_value(value.sum)}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | os.PathLike) -> None:
+        """Write the Prometheus text dump to a file, replacing it atomically."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+def start_exporter(metrics: Metrics, path: str | os.PathLike, interval: float = 15.0) -> threading.Thread:
+    """Write the Prometheus text dump to a file every `interval` seconds on a daemon thread."""
+    def export():
+        while True:
+            try:
+                metrics.write_prometheus(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=export, name="metrics-exporter", daemon=True)
+    thread.start()
+    return thread
+
+
+def _payload_bytes(result) -> int:
+    """Size of the text content of a tool result (structured results are sent as JSON text too)."""
+    return sum(len(block.text.encode("utf-8")) for block in getattr(result, "content", ()) if hasattr(block, "text"))
+
+
+class MetricsMiddleware(Middleware):
+    """Record every tool call of a server in a Metrics registry.
+
+    Records 'tool_calls_total', 'tool_errors_total' (calls that raised; tools
+    that report failures in their result count them themselves),
+    the 'tool_latency_seconds' histogram and 'tool_request_bytes_total' /
+    'tool_response_bytes_total', all labelled by tool.
+    """
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+        metrics.describe("tool_calls_total", "Tool calls by tool")
+        metrics.describe("tool_errors_total", "Tool calls that failed")
+        metrics.describe("tool_latency_seconds", "Tool call latency in seconds")
+        metrics.describe("tool_request_bytes_total", "Size of the tool call arguments in bytes")
+        metrics.describe("tool_response_bytes_total", "Size of the tool result text in bytes")
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        started = time.perf_counter()
+        result = None
+        try:
+            result = await call_next(context)
+            return result
+        except Exception:
+            self.metrics.inc("tool_errors_total", tool=tool)
+            raise
+        finally:
+            self.metrics.observe("tool_latency_seconds", time.perf_counter() - started, tool=tool)
+            self.metrics.inc("tool_calls_total", tool=tool)
+            arguments = json.dumps(context.message.arguments or {}, ensure_ascii=False, default=str)
+            self.metrics.inc("tool_request_bytes_total", len(arguments.encode("utf-8")), tool=tool)
+            if result is not None:
+                self.metrics.inc("tool_response_bytes_total", _payload_bytes(result), tool=tool)
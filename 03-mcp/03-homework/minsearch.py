@@ -1,26 +1,391 @@
+import bisect
+import copy
+import itertools
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
 import pandas as pd
 
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
 import numpy as np
 
 import warnings
 
+FORMAT_VERSION = 4
+
+# Number of queries scored together by Index.search_batch
+BATCH_CHUNK_SIZE = 256
+
+# Scoring engines: "dense" scores every document, "inverted" only walks the postings of query terms
+ENGINES = ("dense", "inverted")
+
+# Ranking functions: TF-IDF cosine similarity or Okapi BM25
+SCORINGS = ("tfidf", "bm25")
+
+DEFAULT_BM25_PARAMS = {"k1": 1.2, "b": 0.75}
+
+# Storage types of document weights: floats, or integers scaled by a per-field factor
+WEIGHT_DTYPES = ("float64", "float32", "uint16", "uint8")
+
+# Kinds of values in a DocStore column
+_MISSING, _STR, _JSON, _PICKLE = 0, 1, 2, 3
+
+
+class _Segment:
+    """
+    A block of consecutively numbered documents with its own matrices and keyword index.
+
+    Attributes:
+        start (int): Id of the first document of the segment in Index.docs.
+        size (int): Number of documents in the segment.
+        text_matrices (dict): TF-IDF matrix of the segment for each text field.
+        postings (dict): Term-to-document matrix of the segment for each text field (inverted engine only).
+        keyword_index (dict): Keyword field -> value -> sorted array of segment-local document ids.
+    """
+
+    def __init__(self, start, size, text_matrices, postings, keyword_index):
+        self.start = start
+        self.size = size
+        self.text_matrices = text_matrices
+        self.postings = postings
+        self.keyword_index = keyword_index
+
+
+class _QueryCache:
+    """A thread-safe LRU cache of query results with optional expiry and hit/miss counters."""
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @property
+    def generation(self):
+        """Counter bumped by every `clear`, so results computed before a clear are not stored."""
+        return self._generation
+
+    def get(self, key):
+        """Returns the cached value for the key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key, value, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            expires = time.monotonic() + self.ttl if self.ttl is not None else None
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def info(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                size=len(self._entries),
+                max_size=self.max_size,
+                ttl=self.ttl,
+            )
+
+
+class DocStore:
+    """
+    A compact, column-oriented store of documents.
+
+    Every field is kept as one UTF-8 byte buffer holding the values of all documents back to
+    back, with an offsets array pointing into it. String values are stored as their UTF-8
+    bytes, other values as JSON, or pickled when JSON would not give them back unchanged
+    (dates, tuples, dicts with non-string keys...). Documents are only decoded into dicts
+    when they are read, and reads can be limited to a subset of fields, so a large corpus
+    costs little more than its encoded size. Reads return equal copies, not the dicts that
+    were stored. Saved stores can be memory-mapped; only load stores you trust, since
+    pickled values are unpickled on read.
+
+    Documents appended with `extend` go into a new chunk, so adding does not copy the
+    existing buffers.
+
+    Attributes:
+        fields (list): Names of all fields seen, in order of first appearance.
+    """
+
+    def __init__(self, docs=()):
+        """
+        Initializes the store with the given documents.
+
+        Args:
+            docs (iterable of dict): Documents to store.
+        """
+        self.fields = []
+        self._chunks = []
+        self._starts = []
+        self._size = 0
+        self.extend(docs)
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for doc_id in range(self._size):
+            yield self.get(doc_id)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.get(doc_id) for doc_id in range(*key.indices(self._size))]
+        return self.get(key)
+
+    def extend(self, docs):
+        """
+        Appends documents to the store.
+
+        Args:
+            docs (iterable of dict): Documents to append.
+        """
+        docs = list(docs)
+        if not docs:
+            return
+
+        known = set(self.fields)
+        for doc in docs:
+            for field in doc:
+                if field not in known:
+                    known.add(field)
+                    self.fields.append(field)
+
+        chunk = {}
+        for field in self.fields:
+            column = _encode_column(docs, field)
+            if column is not None:
+                chunk[field] = column
+
+        self._chunks.append(chunk)
+        self._starts.append(self._size)
+        self._size += len(docs)
+
+    def copy(self):
+        """Returns a store that shares the existing chunks but can be extended independently."""
+        clone = DocStore()
+        clone.fields = list(self.fields)
+        clone._chunks = list(self._chunks)
+        clone._starts = list(self._starts)
+        clone._size = self._size
+        return clone
+
+    def get(self, doc_id, fields=None):
+        """
+        Decodes one document.
+
+        Args:
+            doc_id (int): Position of the document in the store.
+            fields (list, optional): Fields to include. Defaults to all fields of the document.
+
+        Returns:
+            dict: The document, restricted to the requested fields it has.
+        """
+        if doc_id < 0:
+            doc_id += self._size
+        if not 0 <= doc_id < self._size:
+            raise IndexError(f"Document id {doc_id} out of range")
+
+        position = bisect.bisect_right(self._starts, doc_id) - 1
+        chunk = self._chunks[position]
+        row = doc_id - self._starts[position]
+
+        doc = {}
+        for field in self.fields if fields is None else fields:
+            column = chunk.get(field)
+            if column is not None and column[2][row] != _MISSING:
+                doc[field] = _decode_value(column, row)
+        return doc
+
+    def column(self, field, default="", start=0):
+        """
+        Decodes a single field of every document from `start` on.
+
+        Args:
+            field (str): Field to read.
+            default: Value used for documents without the field. Defaults to "".
+            start (int): Id of the first document to read. Defaults to 0.
+
+        Returns:
+            list: One value per document.
+        """
+        values = []
+        for chunk_start, chunk in zip(self._starts, self._chunks):
+            chunk_size = self._chunk_size(chunk_start)
+            first = max(start - chunk_start, 0)
+            if first >= chunk_size:
+                continue
+
+            column = chunk.get(field)
+            if column is None:
+                values.extend([default] * (chunk_size - first))
+                continue
+            for row in range(first, chunk_size):
+                values.append(default if column[2][row] == _MISSING else _decode_value(column, row))
+        return values
+
+    @property
+    def nbytes(self):
+        """Total size in bytes of the buffers, offsets and kinds of all columns."""
+        return sum(
+            sum(array.nbytes for array in column)
+            for chunk in self._chunks
+            for column in chunk.values()
+        )
+
+    def save(self, path, prefix="docs"):
+        """
+        Writes the store as one buffer/offsets/kinds .npy triple per field plus a JSON field list.
+
+        Args:
+            path (str or Path): Directory to write to. Must exist.
+            prefix (str): Prefix of the file names. Defaults to "docs".
+        """
+        path = Path(path)
+        for i, field in enumerate(self.fields):
+            buffer, offsets, kinds = self._merged_column(field)
+            _save_npy(path / f"{prefix}_{i}_buffer.npy", buffer)
+            _save_npy(path / f"{prefix}_{i}_offsets.npy", offsets)
+            _save_npy(path / f"{prefix}_{i}_kinds.npy", kinds)
+
+        _save_json(path / f"{prefix}_fields.json", {"fields": self.fields, "num_docs": self._size})
+
+    @classmethod
+    def load(cls, path, prefix="docs", mmap=True):
+        """
+        Loads a store written with `DocStore.save`.
+
+        Args:
+            path (str or Path): Directory the store was saved to.
+            prefix (str): Prefix of the file names. Defaults to "docs".
+            mmap (bool): If True, the buffers are memory-mapped read-only. Defaults to True.
+
+        Returns:
+            DocStore: The loaded store.
+        """
+        path = Path(path)
+        with open(path / f"{prefix}_fields.json", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        mmap_mode = "r" if mmap else None
+        chunk = {}
+        for i, field in enumerate(meta["fields"]):
+            chunk[field] = (
+                np.load(path / f"{prefix}_{i}_buffer.npy", mmap_mode=mmap_mode),
+                np.load(path / f"{prefix}_{i}_offsets.npy", mmap_mode=mmap_mode),
+                np.load(path / f"{prefix}_{i}_kinds.npy", mmap_mode=mmap_mode),
+            )
+
+        store = cls()
+        store.fields = list(meta["fields"])
+        store._size = meta["num_docs"]
+        if store._size:
+            store._chunks = [chunk]
+            store._starts = [0]
+        return store
+
+    def _chunk_size(self, chunk_start):
+        """Returns the number of documents in the chunk starting at `chunk_start`."""
+        position = bisect.bisect_right(self._starts, chunk_start)
+        end = self._starts[position] if position < len(self._starts) else self._size
+        return end - chunk_start
+
+    def _merged_column(self, field):
+        """Concatenates the chunks of one field into a single (buffer, offsets, kinds) triple."""
+        buffers, offsets, kinds = [], [np.zeros(1, dtype=np.int64)], []
+        base = 0
+        for chunk_start, chunk in zip(self._starts, self._chunks):
+            column = chunk.get(field)
+            if column is None:
+                size = self._chunk_size(chunk_start)
+                offsets.append(np.full(size, base, dtype=np.int64))
+                kinds.append(np.full(size, _MISSING, dtype=np.uint8))
+                continue
+            buffers.append(np.asarray(column[0]))
+            offsets.append(np.asarray(column[1][1:]) + base)
+            kinds.append(np.asarray(column[2]))
+            base += len(column[0])
+
+        buffer = np.concatenate(buffers) if buffers else np.empty(0, dtype=np.uint8)
+        return buffer, np.concatenate(offsets), np.concatenate(kinds) if kinds else np.empty(0, dtype=np.uint8)
+
+
 class Index:
     """
-    A simple search index using TF-IDF and cosine similarity for text fields and exact matching for keyword fields.
+    A simple search index using TF-IDF and cosine similarity (or BM25) for text fields and exact matching for keyword fields.
+
+    Documents added after `fit` go into small fresh segments that are scored with the fitted
+    vocabulary and IDF. Once the added and removed documents outweigh `merge_ratio` of the
+    index, everything is refitted into a single segment, which also refreshes the IDF.
 
     Attributes:
         text_fields (list): List of text field names to index.
         keyword_fields (list): List of keyword field names to index.
-        vectorizers (dict): Dictionary of TfidfVectorizer instances for each text field.
+        vectorizers (dict): Dictionary of TfidfVectorizer (CountVectorizer for BM25) instances for each text field.
         keyword_df (pd.DataFrame): DataFrame containing keyword field data.
-        text_matrices (dict): Dictionary of TF-IDF matrices for each text field.
-        docs (list): List of documents indexed.
+        keyword_index (dict): Dictionary mapping each keyword field to a dictionary of value -> sorted array of document ids.
+        text_matrices (dict): Dictionary of TF-IDF (or BM25 term weight) matrices for each text field.
+        bm25_stats (dict): Dictionary of BM25 'idf' vector and average document length 'avgdl' for each text field.
+        weight_scales (dict): Dictionary of the factor turning stored integer weights back into scores for each
+            text field (quantized weight dtypes only).
+        postings (dict): Dictionary of term-to-document matrices for each text field (inverted engine only).
+        docs (DocStore): Documents indexed, including removed documents that have not been merged away yet.
     """
 
-    def __init__(self, text_fields, keyword_fields=None, vectorizer_params=None):
+    def __init__(
+        self,
+        text_fields,
+        keyword_fields=None,
+        vectorizer_params=None,
+        engine="dense",
+        scoring="tfidf",
+        bm25_params=None,
+        id_field=None,
+        merge_ratio=0.2,
+        max_segments=8,
+        cache_size=0,
+        cache_ttl=None,
+        weight_dtype="float64",
+        prune_threshold=None,
+        prune_top_k=None,
+    ):
         """
         Initializes the Index with specified text and keyword fields.
 
@@ -28,18 +393,77 @@ class Index:
             text_fields (list): List of text field names to index.
             keyword_fields (list, optional): List of keyword field names to index. Defaults to empty list.
             vectorizer_params (dict): Optional parameters to pass to TfidfVectorizer.
+            engine (str): Scoring engine. "dense" computes a similarity against every document,
+                "inverted" accumulates scores only for documents that contain a query term.
+                Both return the same ranking. With TF-IDF scoring the inverted engine relies on
+                L2-normalized rows, so it cannot be combined with another `norm`. Defaults to "dense".
+            scoring (str): Ranking function. "tfidf" uses the cosine similarity of TF-IDF vectors,
+                "bm25" uses Okapi BM25 with per-field document lengths. Defaults to "tfidf".
+            bm25_params (dict, optional): BM25 'k1' and 'b' parameters. Defaults to k1=1.2, b=0.75.
+            id_field (str, optional): Field identifying documents for `remove` and `update`.
+            merge_ratio (float): Fraction of added plus removed documents, relative to the fitted
+                ones, above which the index is refitted. Defaults to 0.2.
+            max_segments (int): Number of fresh segments above which they are combined into one. Defaults to 8.
+            cache_size (int): Maximum number of query results kept in an LRU cache. The cache is
+                cleared whenever the index is refitted or changed. Defaults to 0 (no cache).
+            cache_ttl (float, optional): Seconds after which a cached result expires. Defaults to no expiry.
+            weight_dtype (str): Storage type of the document weights. "float32" halves the
+                memory of the matrices and speeds up the sparse products; "uint16" and "uint8"
+                store weights quantized against the largest weight of each field, for a quarter
+                or an eighth of the memory at the cost of converting them when scoring. The
+                dense engine's cosine similarity renormalizes quantized TF-IDF rows, so its scores
+                differ from the inverted engine by the quantization error. Defaults to "float64".
+            prune_threshold (float, optional): Weights below this value are dropped from the matrices.
+            prune_top_k (int, optional): Only the `prune_top_k` largest weights of every document are kept.
+                With either pruning option, L2-normalized TF-IDF rows are normalized again afterwards.
         """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if scoring not in SCORINGS:
+            raise ValueError(f"Unknown scoring {scoring!r}, expected one of {SCORINGS}")
+        if weight_dtype not in WEIGHT_DTYPES:
+            raise ValueError(f"Unknown weight dtype {weight_dtype!r}, expected one of {WEIGHT_DTYPES}")
+        if engine == "inverted" and scoring == "tfidf" and (vectorizer_params or {}).get("norm", "l2") != "l2":
+            raise ValueError('engine="inverted" requires L2-normalized TF-IDF rows (vectorizer norm "l2")')
+
         self.text_fields = text_fields
         self.keyword_fields = keyword_fields if keyword_fields is not None else []
         if vectorizer_params is None:
             vectorizer_params = {}
+        self.vectorizer_params = vectorizer_params
+        self.engine = engine
+        self.scoring = scoring
+        self.bm25_params = dict(DEFAULT_BM25_PARAMS, **(bm25_params or {}))
+        self.id_field = id_field
+        self.merge_ratio = merge_ratio
+        self.max_segments = max_segments
+        self.weight_dtype = weight_dtype
+        self.prune_threshold = prune_threshold
+        self.prune_top_k = prune_top_k
 
         self.vectorizers = {
-            field: TfidfVectorizer(**vectorizer_params) for field in text_fields
+            field: _make_vectorizer(scoring, vectorizer_params) for field in text_fields
         }
-        self.keyword_df = None
+        self.bm25_stats = {}
+        self.weight_scales = {}
+        self.keyword_index = {}
         self.text_matrices = {}
-        self.docs = []
+        self.postings = {}
+        self.docs = DocStore()
+
+        self._segments = []
+        self._deleted = set()
+        self._deleted_ids = np.empty(0, dtype=np.int64)
+        self._id_index = {}
+        self._cache = _QueryCache(cache_size, cache_ttl)
+        self._normalize_queries = all(
+            _is_default_word_analyzer(vectorizer) for vectorizer in self.vectorizers.values()
+        )
+
+    @property
+    def keyword_df(self):
+        """DataFrame with the keyword fields of every document in `docs`."""
+        return pd.DataFrame({field: self.docs.column(field) for field in self.keyword_fields})
 
     def fit(self, docs):
         """
@@ -48,66 +472,1372 @@ class Index:
         Args:
             docs (list of dict): List of documents to index. Each document is a dictionary.
         """
-        self.docs = docs
+        return self._fit(docs, fit_vectorizers=True)
+
+    def _fit(self, docs, fit_vectorizers):
+        """Indexes the documents, fitting the vectorizers first unless they were restored from global statistics."""
+        docs = list(docs)
         keyword_data = {field: [] for field in self.keyword_fields}
 
+        self.text_matrices = {}
+        self.postings = {}
         for field in self.text_fields:
             texts = [doc.get(field, "") for doc in docs]
-            self.text_matrices[field] = self.vectorizers[field].fit_transform(texts)
+            self.text_matrices[field] = self._vectorize_docs(field, texts, fit_vectorizers)
+            if self.engine == "inverted":
+                self.postings[field] = self.text_matrices[field].T.tocsr()
 
+        self.docs = DocStore(docs)
         for doc in docs:
             for field in self.keyword_fields:
                 keyword_data[field].append(doc.get(field, ""))
 
-        self.keyword_df = pd.DataFrame(keyword_data)
+        self.keyword_index = _build_keyword_index(keyword_data)
+        self._reset_segments()
+
+        return self
+
+    def fit_stream(self, docs, batch_size=1000):
+        """
+        Fits the index from an iterable of documents, consuming it in batches.
+
+        Each batch is counted against a vocabulary that grows as new terms appear and then
+        moved into the document store, so only one batch is held as dicts at a time and
+        the iterable is read once. Vocabulary limits and IDF are applied when the stream
+        is exhausted, which gives the same index as `fit` on the whole list.
+
+        Args:
+            docs (iterable of dict): Documents to index, e.g. a generator.
+            batch_size (int): Number of documents read and counted at a time. Defaults to 1000.
+        """
+        counters = {field: _unbounded_counter(self.vectorizers[field]) for field in self.text_fields}
+        analyzers = {field: counter.build_analyzer() for field, counter in counters.items()}
+        vocabularies = {field: {} for field in self.text_fields}
+        batch_counts = {field: [] for field in self.text_fields}
+        keyword_data = {field: [] for field in self.keyword_fields}
+        self.docs = DocStore()
+
+        docs = iter(docs)
+        while batch := list(itertools.islice(docs, batch_size)):
+            for field in self.text_fields:
+                texts = [doc.get(field, "") for doc in batch]
+                batch_counts[field].append(_count_terms(
+                    analyzers[field], texts, vocabularies[field], counters[field].binary
+                ))
+            for field in self.keyword_fields:
+                keyword_data[field].extend(doc.get(field, "") for doc in batch)
+            self.docs.extend(batch)
+
+        if not self.docs:
+            raise ValueError("Cannot fit an index on an empty stream of documents")
+
+        self.text_matrices = {}
+        self.postings = {}
+        for field in self.text_fields:
+            self.text_matrices[field] = self._weigh_stream(
+                field, vocabularies.pop(field), batch_counts.pop(field)
+            )
+            if self.engine == "inverted":
+                self.postings[field] = self.text_matrices[field].T.tocsr()
+
+        self.keyword_index = _build_keyword_index(keyword_data)
+        self._reset_segments()
 
         return self
 
-    def search(self, query, filter_dict=None, boost_dict=None, num_results=10):
+    def _weigh_stream(self, field, vocabulary, batch_counts):
+        """Applies vocabulary limits and IDF to the streamed term counts of a field and returns its document matrix."""
+        for counts in batch_counts:
+            counts.resize((counts.shape[0], len(vocabulary)))
+        counts = sparse.vstack(batch_counts, format="csr")
+        batch_counts.clear()
+
+        df = np.bincount(counts.indices, minlength=len(vocabulary))
+        tf = np.asarray(counts.sum(axis=0)).ravel()
+        terms, idf, avgdl = _global_vocabulary(
+            self.vectorizers[field], [(list(vocabulary), df, tf)], counts.shape[0], self.scoring
+        )
+        counts = counts[:, [vocabulary[term] for term in terms]]
+
+        self._restore_field(field, terms, idf, avgdl)
+        if self.scoring == "bm25":
+            weights = _bm25_weights(counts, self.bm25_stats[field], **self.bm25_params)
+        else:
+            weights = _tfidf_weights(counts, self.vectorizers[field])
+        return self._compact_weights(field, weights, fit=True)
+
+    def add(self, docs):
+        """
+        Adds documents without refitting the index.
+
+        The documents go into a fresh segment vectorized with the fitted vocabulary and IDF,
+        so the cost is proportional to the number of added documents. Terms unknown to the
+        fitted vocabulary become searchable once the index is merged.
+
+        Args:
+            docs (list of dict): Documents to add.
+        """
+        docs = list(docs)
+        if not self._segments:
+            return self.fit(docs)
+
+        self._add_segment(docs)
+        self._maybe_merge()
+        return self
+
+    def remove(self, ids):
+        """
+        Removes the documents whose `id_field` value is in `ids`.
+
+        Removed documents are masked out of search results right away and dropped from
+        the matrices at the next merge.
+
+        Args:
+            ids (list): Values of `id_field` to remove.
+        """
+        self._remove_ids(ids)
+        self._maybe_merge()
+        return self
+
+    def update(self, docs):
+        """
+        Replaces the documents sharing an `id_field` value with the given ones.
+
+        Documents with an id that is not in the index yet are simply added.
+
+        Args:
+            docs (list of dict): New versions of the documents.
+        """
+        docs = list(docs)
+        if not self._segments:
+            return self.fit(docs)
+
+        self._remove_ids([doc.get(self.id_field) for doc in docs])
+        if docs:
+            self._add_segment(docs)
+        self._maybe_merge()
+        return self
+
+    def copy(self):
+        """
+        Returns a copy of the index that can be changed without affecting this one.
+
+        Matrices and stored documents are shared rather than duplicated, since `add`,
+        `remove`, `update` and `merge` replace them instead of modifying them in place.
+        This makes it cheap to apply changes to a copy while searches keep running on
+        the original, then swap the two.
+
+        Returns:
+            Index: The copy, with an empty query cache of the same size and expiry.
+        """
+        clone = copy.copy(self)
+        clone.vectorizers = copy.deepcopy(self.vectorizers)
+        clone.bm25_stats = dict(self.bm25_stats)
+        clone.weight_scales = dict(self.weight_scales)
+        clone.docs = self.docs.copy()
+        clone._segments = list(self._segments)
+        clone._deleted = set(self._deleted)
+        clone._id_index = {key: list(doc_ids) for key, doc_ids in self._id_index.items()}
+        clone._cache = _QueryCache(self._cache.max_size, self._cache.ttl)
+        return clone
+
+    def merge(self):
+        """
+        Refits the index on the documents that are still live.
+
+        This folds all fresh segments into one, drops removed documents and recomputes the
+        vocabulary and IDF over the current corpus. If some text field has no term left in
+        the live documents (e.g. every document was removed), no vocabulary can be fitted:
+        the current segments are kept, with removed documents masked out, until documents
+        with terms are added.
+        """
+        live_docs = [doc for i, doc in enumerate(self.docs) if i not in self._deleted]
+        if not self._has_terms(live_docs):
+            return self
+        return self.fit(live_docs)
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_fields=None):
         """
         Searches the index with the given query, filters, and boost parameters.
 
         Args:
             query (str): The search query string.
             filter_dict (dict): Dictionary of keyword fields to filter by. Keys are field names and values are the values to filter by.
+                A list of values matches any of them, and {"not": value_or_list} excludes the given values.
             boost_dict (dict): Dictionary of boost scores for text fields. Keys are field names and values are the boost scores.
             num_results (int): The number of top results to return. Defaults to 10.
+            output_fields (list, optional): Fields to include in the returned documents. Defaults to all fields.
 
         Returns:
             list of dict: List of documents matching the search criteria, ranked by relevance.
         """
-        if filter_dict is None:
-            filter_dict = {}
+        return self.search_batch(
+            [query],
+            filter_dicts=[filter_dict],
+            boost_dict=boost_dict,
+            num_results=num_results,
+            output_fields=output_fields,
+        )[0]
+
+    def search_batch(self, queries, filter_dicts=None, boost_dict=None, num_results=10, output_fields=None):
+        """
+        Searches the index with many queries at once.
+
+        All queries are vectorized together and scored with one sparse matrix product per
+        text field, followed by a row-wise top-k. The result for each query is the same as
+        calling `search` with it.
+
+        Args:
+            queries (list of str): The search query strings.
+            filter_dicts (dict or list of dict, optional): Keyword filters. Either a single
+                dictionary applied to every query or a list with one dictionary (or None) per query.
+            boost_dict (dict): Dictionary of boost scores for text fields, shared by all queries.
+            num_results (int): The number of top results to return per query. Defaults to 10.
+            output_fields (list, optional): Fields to include in the returned documents. Defaults to all fields.
+
+        Returns:
+            list of list of dict: One ranked result list per query.
+        """
+        return [
+            [self.docs.get(i, output_fields) for i in doc_ids]
+            for doc_ids in self.search_batch_ids(queries, filter_dicts, boost_dict, num_results)
+        ]
+
+    def search_batch_ids(self, queries, filter_dicts=None, boost_dict=None, num_results=10):
+        """
+        Searches the index with many queries at once and returns document ids instead of documents.
+
+        An id is the position of a document in `docs` (see `DocStore.get`), which tells apart
+        documents with equal fields. Ids are only valid for this index: `add`, `remove`,
+        `update` and `merge` may renumber them, on a copy or on the index itself.
+
+        Args:
+            queries (list of str): The search query strings.
+            filter_dicts (dict or list of dict, optional): Keyword filters, see `search_batch`.
+            boost_dict (dict): Dictionary of boost scores for text fields, shared by all queries.
+            num_results (int): The number of top results to return per query. Defaults to 10.
+
+        Returns:
+            list of numpy.ndarray: One array of ranked document ids per query.
+        """
+        return [
+            doc_ids for doc_ids, _ in self._search_ids(queries, filter_dicts, boost_dict, num_results)
+        ]
+
+    def cache_info(self):
+        """
+        Returns statistics of the query result cache.
+
+        Returns:
+            dict: Counts of 'hits', 'misses', 'evictions' and 'expirations', plus the current 'size',
+            'max_size' and 'ttl'.
+        """
+        return self._cache.info()
+
+    def clear_cache(self):
+        """Drops all cached query results."""
+        self._cache.clear()
+
+    def _search_ids(self, queries, filter_dicts, boost_dict, num_results):
+        """Runs `search_batch` and returns (doc ids, scores) arrays, best first, for each query."""
+        queries = list(queries)
+        if filter_dicts is None or isinstance(filter_dicts, dict):
+            filter_dicts = [filter_dicts] * len(queries)
+        else:
+            filter_dicts = list(filter_dicts)
+            if len(filter_dicts) != len(queries):
+                raise ValueError("filter_dicts must have one entry per query")
         if boost_dict is None:
             boost_dict = {}
 
-        query_vecs = {
-            field: self.vectorizers[field].transform([query])
-            for field in self.text_fields
-        }
-        scores = np.zeros(len(self.docs))
+        if not self._cache.enabled:
+            return self._compute_ids(queries, filter_dicts, boost_dict, num_results)
+
+        generation = self._cache.generation
+        results = [None] * len(queries)
+        keys = []
+        missing = []
+        for row, (query, filter_dict) in enumerate(zip(queries, filter_dicts)):
+            key = self._cache_key(query, filter_dict, boost_dict, num_results)
+            keys.append(key)
+            results[row] = self._cache.get(key)
+            if results[row] is None:
+                missing.append(row)
+
+        if missing:
+            computed = self._compute_ids(
+                [queries[row] for row in missing],
+                [filter_dicts[row] for row in missing],
+                boost_dict,
+                num_results,
+            )
+            for row, result in zip(missing, computed):
+                results[row] = result
+                self._cache.put(keys[row], result, generation)
+
+        return results
+
+    def _cache_key(self, query, filter_dict, boost_dict, num_results):
+        """Builds the cache key of a query; whitespace and case are folded when the analyzers ignore them."""
+        if self._normalize_queries:
+            query = " ".join(query.lower().split())
+        return (query, _freeze(filter_dict or {}), _freeze(boost_dict), num_results)
+
+    def _compute_ids(self, queries, filter_dicts, boost_dict, num_results):
+        """Scores and ranks the queries without going through the cache."""
+        results = []
+        for start in range(0, len(queries), BATCH_CHUNK_SIZE):
+            chunk = queries[start:start + BATCH_CHUNK_SIZE]
+            chunk_filters = filter_dicts[start:start + BATCH_CHUNK_SIZE]
+
+            query_vecs = {
+                field: self.vectorizers[field].transform(chunk).astype(self._query_dtype, copy=False)
+                for field in self.text_fields
+            }
+            chunk_results = [None] * len(chunk)
+            unfiltered_rows = []
+
+            # Filtered queries only score their candidate documents
+            for row, filter_dict in enumerate(chunk_filters):
+                if not self._has_filters(filter_dict):
+                    unfiltered_rows.append(row)
+                    continue
+                doc_ids, scores = self._search_candidates(query_vecs, row, filter_dict, boost_dict)
+                chunk_results[row] = _rank_candidates(doc_ids, scores, num_results)
+
+            if self.engine == "inverted":
+                for row in unfiltered_rows:
+                    doc_ids, scores = self._search_postings(query_vecs, row, boost_dict)
+                    chunk_results[row] = _rank_candidates(doc_ids, scores, num_results)
+            elif unfiltered_rows:
+                row_vecs = {
+                    field: query_vec[unfiltered_rows]
+                    for field, query_vec in query_vecs.items()
+                }
+                scores = np.hstack([
+                    self._score_queries(segment, row_vecs, len(unfiltered_rows), boost_dict)
+                    for segment in self._segments
+                ])
+                if len(self._deleted_ids):
+                    scores[:, self._deleted_ids] = 0
+                for row, ranked in zip(unfiltered_rows, _top_rows(scores, num_results)):
+                    chunk_results[row] = ranked
+
+            results.extend(chunk_results)
+
+        return results
+
+    def _search_candidates(self, query_vecs, row, filter_dict, boost_dict):
+        """Scores one query against the documents matching its filters in every segment."""
+        doc_id_parts = []
+        score_parts = []
+        for segment in self._segments:
+            candidates = self._filter_candidates(segment, filter_dict)
+            doc_id_parts.append(candidates + segment.start)
+            score_parts.append(self._score_candidates(segment, query_vecs, row, candidates, boost_dict))
+        return self._drop_deleted(np.concatenate(doc_id_parts), np.concatenate(score_parts))
+
+    def _search_postings(self, query_vecs, row, boost_dict):
+        """Scores one query through the postings of every segment."""
+        doc_id_parts = []
+        score_parts = []
+        for segment in self._segments:
+            doc_ids, scores = self._score_postings(segment, query_vecs, row, boost_dict)
+            doc_id_parts.append(doc_ids + segment.start)
+            score_parts.append(scores)
+        return self._drop_deleted(np.concatenate(doc_id_parts), np.concatenate(score_parts))
+
+    def _score_queries(self, segment, query_vecs, num_queries, boost_dict):
+        """Returns a (num_queries, segment.size) array of boosted cosine similarity scores."""
+        scores = np.zeros((num_queries, segment.size))
 
         # Compute cosine similarity for each text field and apply boost
         for field, query_vec in query_vecs.items():
-            sim = cosine_similarity(query_vec, self.text_matrices[field]).flatten()
+            sim = self._similarity(field, query_vec, segment.text_matrices[field])
             boost = boost_dict.get(field, 1)
             scores += sim * boost
 
-        # Apply keyword filters
-        for field, value in filter_dict.items():
-            if field in self.keyword_fields:
-                mask = self.keyword_df[field] == value
-                scores = scores * mask.to_numpy()
+        return scores
+
+    def _similarity(self, field, query_vecs, doc_matrix):
+        """Returns the dense (num_queries, num_docs) similarity matrix for the configured scoring."""
+        if self.scoring == "bm25":
+            sim = (query_vecs @ doc_matrix.T).toarray()
+            if field in self.weight_scales:
+                sim *= self.weight_scales[field]
+            return sim
+        # Cosine similarity does not depend on the scale of quantized weights
+        return cosine_similarity(query_vecs, doc_matrix)
+
+    @property
+    def _query_dtype(self):
+        """Float type of query vectors, matching float32 weights so products need no upcast."""
+        return np.float32 if self.weight_dtype == "float32" else np.float64
+
+    def _vectorize_docs(self, field, texts, fit):
+        """
+        Turns the texts of a field into the document matrix used for scoring.
+
+        For BM25 the term counts and document lengths are folded into precomputed per-term
+        weights, so scoring is a sparse product with the query term counts.
+        """
+        vectorizer = self.vectorizers[field]
+        matrix = vectorizer.fit_transform(texts) if fit else vectorizer.transform(texts)
+        if self.scoring == "bm25":
+            if fit:
+                self.bm25_stats[field] = _bm25_stats(matrix)
+            matrix = _bm25_weights(matrix, self.bm25_stats[field], **self.bm25_params)
+
+        return self._compact_weights(field, matrix, fit)
+
+    def _compact_weights(self, field, matrix, fit):
+        """
+        Prunes a document matrix and converts it to the configured weight dtype.
+
+        Quantized weights are stored as round(weight / scale), where the scale maps the
+        largest weight seen at fit time to the largest integer; later segments reuse it
+        and clip above it. Shards restored from global statistics fit their own scale.
+        """
+        if self.prune_threshold is not None or self.prune_top_k is not None:
+            matrix = _prune_rows(matrix, self.prune_threshold, self.prune_top_k)
+            if self.scoring == "tfidf" and self.vectorizers[field].norm == "l2":
+                matrix = normalize(matrix)
+
+        dtype = np.dtype(self.weight_dtype)
+        if dtype.kind == "f":
+            return matrix.astype(dtype, copy=False)
+
+        if fit or field not in self.weight_scales:
+            max_weight = matrix.data.max() if matrix.nnz else 0.0
+            self.weight_scales[field] = float(max_weight or 1.0) / np.iinfo(dtype).max
+        return _quantize(matrix, self.weight_scales[field], dtype)
+
+    def _score_postings(self, segment, query_vecs, row, boost_dict):
+        """
+        Scores one query by walking the postings of its terms only.
+
+        The TF-IDF rows of both the query and the documents are L2-normalized, so the
+        cosine similarity is the dot product accumulated over the shared terms. BM25
+        scores are the same dot product between query term counts and term weights.
+
+        Returns:
+            tuple: Sorted array of segment-local candidate document ids and their boosted scores.
+        """
+        doc_id_parts = []
+        score_parts = []
+
+        for field, query_vec in query_vecs.items():
+            start, end = query_vec.indptr[row], query_vec.indptr[row + 1]
+            terms = query_vec.indices[start:end]
+            if len(terms) == 0:
+                continue
+            weights = query_vec.data[start:end] * boost_dict.get(field, 1) * self.weight_scales.get(field, 1)
+
+            postings = segment.postings[field]
+            starts = postings.indptr[terms]
+            lengths = postings.indptr[terms + 1] - starts
+            positions = _concat_ranges(starts, lengths)
+
+            doc_id_parts.append(postings.indices[positions])
+            score_parts.append(postings.data[positions] * np.repeat(weights, lengths))
+
+        if not doc_id_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        doc_ids, inverse = np.unique(np.concatenate(doc_id_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts), minlength=len(doc_ids))
+        return doc_ids, scores
+
+    def _score_candidates(self, segment, query_vecs, row, candidates, boost_dict):
+        """Returns the boosted cosine similarity scores of one query against the candidate documents only."""
+        scores = np.zeros(len(candidates))
+        if len(candidates) == 0:
+            return scores
+
+        for field, query_vec in query_vecs.items():
+            sim = self._similarity(field, query_vec[row], segment.text_matrices[field][candidates]).flatten()
+            boost = boost_dict.get(field, 1)
+            scores += sim * boost
+
+        return scores
+
+    def _has_filters(self, filter_dict):
+        """Returns True if any filter applies to an indexed keyword field."""
+        return any(field in self.keyword_fields for field in (filter_dict or {}))
+
+    def _filter_candidates(self, segment, filter_dict):
+        """
+        Resolves keyword filters against the keyword index of a segment.
+
+        Returns:
+            np.ndarray: Sorted segment-local ids of the documents matching every filter.
+        """
+        candidates = None
+        excluded = []
+
+        for field, value in (filter_dict or {}).items():
+            if field not in self.keyword_fields:
+                continue
+            value_index = segment.keyword_index[field]
+
+            if isinstance(value, dict) and "not" in value:
+                excluded.append(_lookup_values(value_index, value["not"]))
+                continue
+
+            matches = _lookup_values(value_index, value)
+            if candidates is None:
+                candidates = matches
+            else:
+                candidates = np.intersect1d(candidates, matches, assume_unique=True)
+
+        if candidates is None:
+            candidates = np.arange(segment.size)
+        if excluded:
+            candidates = np.setdiff1d(candidates, np.concatenate(excluded))
+
+        return candidates
+
+    def _drop_deleted(self, doc_ids, scores):
+        """Removes documents that were removed from the index from a candidate list."""
+        if len(self._deleted_ids) == 0:
+            return doc_ids, scores
+        live = ~np.isin(doc_ids, self._deleted_ids)
+        return doc_ids[live], scores[live]
+
+    def _restore_field(self, field, terms, idf, avgdl=None):
+        """Puts the vectorizer of a field into the fitted state described by its vocabulary and statistics."""
+        vectorizer = self.vectorizers[field]
+        vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms)}
+        if self.scoring == "bm25":
+            self.bm25_stats[field] = {"idf": np.asarray(idf), "avgdl": avgdl}
+        else:
+            vectorizer.idf_ = np.asarray(idf)
+
+    def _reset_segments(self):
+        """Makes the fitted matrices the only segment and forgets removed documents."""
+        self._segments = [
+            _Segment(0, len(self.docs), self.text_matrices, self.postings, self.keyword_index)
+        ]
+        self._deleted = set()
+        self._deleted_ids = np.empty(0, dtype=np.int64)
+        self._cache.clear()
+
+        self._id_index = {}
+        if self.id_field is not None:
+            for doc_id, value in enumerate(self.docs.column(self.id_field, default=None)):
+                self._id_index.setdefault(value, []).append(doc_id)
+
+    def _build_segment(self, docs, start):
+        """Vectorizes documents with the fitted vectorizers into a segment starting at `start`."""
+        text_matrices = {}
+        postings = {}
+        for field in self.text_fields:
+            texts = [doc.get(field, "") for doc in docs]
+            text_matrices[field] = self._vectorize_docs(field, texts, fit=False)
+            if self.engine == "inverted":
+                postings[field] = text_matrices[field].T.tocsr()
+
+        keyword_data = {
+            field: [doc.get(field, "") for doc in docs] for field in self.keyword_fields
+        }
+        return _Segment(start, len(docs), text_matrices, postings, _build_keyword_index(keyword_data))
+
+    def _add_segment(self, docs):
+        """Appends documents to `docs` and indexes them as a new segment."""
+        start = len(self.docs)
+        self.docs.extend(docs)
+        self._segments.append(self._build_segment(docs, start))
+        self._cache.clear()
+
+        if self.id_field is not None:
+            for doc_id, doc in enumerate(docs, start):
+                self._id_index.setdefault(doc.get(self.id_field), []).append(doc_id)
+
+    def _remove_ids(self, ids):
+        """Marks every live document with one of the given ids as removed."""
+        if self.id_field is None:
+            raise ValueError("id_field must be set to remove or update documents")
+
+        removed = []
+        for doc_id in ids:
+            removed.extend(self._id_index.pop(doc_id, []))
+        if removed:
+            self._deleted.update(removed)
+            self._deleted_ids = np.union1d(self._deleted_ids, removed)
+            self._cache.clear()
+
+    def _has_terms(self, docs):
+        """Returns True if every text field has at least one term to index in the documents."""
+        for field in self.text_fields:
+            analyzer = self.vectorizers[field].build_analyzer()
+            if not any(analyzer(doc.get(field, "")) for doc in docs):
+                return False
+        return True
+
+    def _maybe_merge(self):
+        """Refits or combines fresh segments once they grow past the merge thresholds."""
+        fitted = self._segments[0].size
+        changed = len(self.docs) - fitted + len(self._deleted)
+        if changed > self.merge_ratio * max(fitted, 1):
+            self.merge()
+        elif len(self._segments) - 1 > self.max_segments:
+            self._combine_fresh_segments()
+
+    def _combine_fresh_segments(self):
+        """Rebuilds all fresh segments as a single one; costs time proportional to their size."""
+        fresh = self._segments[1:]
+        start = fresh[0].start
+
+        text_matrices = {}
+        postings = {}
+        for field in self.text_fields:
+            text_matrices[field] = sparse.vstack(
+                [segment.text_matrices[field] for segment in fresh], format="csr"
+            )
+            if self.engine == "inverted":
+                postings[field] = text_matrices[field].T.tocsr()
+
+        keyword_data = {
+            field: self.docs.column(field, start=start) for field in self.keyword_fields
+        }
+        combined = _Segment(start, len(self.docs) - start, text_matrices, postings, _build_keyword_index(keyword_data))
+        self._segments = [self._segments[0], combined]
+
+    def save(self, path):
+        """
+        Saves the fitted index to a directory so it can be reopened with `Index.load`.
+
+        Vocabularies are stored as JSON, IDF vectors, the CSR arrays
+        (data/indices/indptr) of every TF-IDF matrix and the document store as
+        raw .npy files that can be memory-mapped on load. The keyword index is
+        rebuilt from the stored documents on load, so keyword values need no
+        encoding of their own. Fresh segments and removed documents are
+        merged before saving. Existing files are replaced rather than rewritten, so an index loaded from
+        `path` with mmap=True (here or in another process) stays intact when saved back to it.
+
+        Args:
+            path (str or Path): Directory to write the index to. Created if missing.
+        """
+        if len(self._segments) > 1 or self._deleted:
+            self.merge()
+            if len(self._segments) > 1 or self._deleted:
+                raise ValueError("Cannot save an index whose live documents have no terms to index")
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        fields = []
+        for i, field in enumerate(self.text_fields):
+            prefix = f"text_{i}"
+            matrix = self.text_matrices[field].tocsr()
+            vectorizer = self.vectorizers[field]
+
+            _save_csr(path, prefix, matrix)
+            if self.engine == "inverted":
+                _save_csr(path, f"{prefix}_postings", self.postings[field])
+
+            entry = {"name": field, "prefix": prefix, "shape": list(matrix.shape)}
+            if field in self.weight_scales:
+                entry["scale"] = self.weight_scales[field]
+            if self.scoring == "bm25":
+                _save_npy(path / f"{prefix}_idf.npy", self.bm25_stats[field]["idf"])
+                entry["avgdl"] = self.bm25_stats[field]["avgdl"]
+            else:
+                _save_npy(path / f"{prefix}_idf.npy", vectorizer.idf_)
+
+            terms = vectorizer.get_feature_names_out().tolist()
+            _save_json(path / f"{prefix}_vocab.json", terms)
+
+            fields.append(entry)
+
+        self.docs.save(path)
+
+        meta = {
+            "format_version": FORMAT_VERSION,
+            "text_fields": self.text_fields,
+            "keyword_fields": self.keyword_fields,
+            "vectorizer_params": self.vectorizer_params,
+            "engine": self.engine,
+            "scoring": self.scoring,
+            "bm25_params": self.bm25_params,
+            "id_field": self.id_field,
+            "weight_dtype": self.weight_dtype,
+            "prune_threshold": self.prune_threshold,
+            "prune_top_k": self.prune_top_k,
+            "cache_size": self._cache.max_size,
+            "cache_ttl": self._cache.ttl,
+            "num_docs": len(self.docs),
+            "fields": fields,
+        }
+        # Written last, so a reader never finds a meta.json describing files that are not there yet
+        _save_json(path / "meta.json", meta, indent=2)
+        # Keyword columns of snapshots before format 4, which the new meta.json no longer refers to
+        (path / "keywords.json").unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path, mmap=True, cache_size=None, cache_ttl=None):
+        """
+        Loads an index previously written with `Index.save`.
+
+        Args:
+            path (str or Path): Directory the index was saved to.
+            mmap (bool): If True, the TF-IDF arrays and documents are memory-mapped read-only instead of
+                read into memory, so several processes opening the same index share pages
+                through the OS page cache. Defaults to True.
+            cache_size (int, optional): Size of the query result cache. Defaults to the saved setting.
+            cache_ttl (float, optional): Expiry of cached results in seconds. Defaults to the saved setting.
+
+        Returns:
+            Index: The loaded index, ready for searching.
+        """
+        path = Path(path)
+        with open(path / "meta.json", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        if meta.get("format_version") not in (1, 2, 3, FORMAT_VERSION):
+            raise ValueError(
+                f"Unsupported index format version {meta.get('format_version')!r} in {path}"
+            )
+
+        index = cls(
+            text_fields=meta["text_fields"],
+            keyword_fields=meta["keyword_fields"],
+            vectorizer_params=meta["vectorizer_params"],
+            engine=meta.get("engine", "dense"),
+            scoring=meta.get("scoring", "tfidf"),
+            bm25_params=meta.get("bm25_params"),
+            id_field=meta.get("id_field"),
+            weight_dtype=meta.get("weight_dtype", "float64"),
+            prune_threshold=meta.get("prune_threshold"),
+            prune_top_k=meta.get("prune_top_k"),
+            cache_size=cache_size if cache_size is not None else meta.get("cache_size", 0),
+            cache_ttl=cache_ttl if cache_ttl is not None else meta.get("cache_ttl"),
+        )
+        mmap_mode = "r" if mmap else None
+
+        for entry in meta["fields"]:
+            field = entry["name"]
+            prefix = entry["prefix"]
+
+            shape = tuple(entry["shape"])
+            index.text_matrices[field] = _load_csr(path, prefix, shape, mmap_mode)
+            if index.engine == "inverted":
+                index.postings[field] = _load_csr(
+                    path, f"{prefix}_postings", shape[::-1], mmap_mode
+                )
+
+            with open(path / f"{prefix}_vocab.json", encoding="utf-8") as f:
+                terms = json.load(f)
+            idf = np.load(path / f"{prefix}_idf.npy")
+            index._restore_field(field, terms, idf, entry.get("avgdl"))
+            if "scale" in entry:
+                index.weight_scales[field] = entry["scale"]
+
+        if meta["format_version"] == 1:
+            with open(path / "docs.json", encoding="utf-8") as f:
+                index.docs = DocStore(json.load(f))
+        else:
+            index.docs = DocStore.load(path, mmap=mmap)
+        index.keyword_index = _build_keyword_index(
+            {field: index.docs.column(field) for field in index.keyword_fields}
+        )
+
+        index._reset_segments()
+        return index
+
+
+class ShardedIndex:
+    """
+    A search index that splits documents across worker processes and searches them in parallel.
+
+    Each shard is an `Index` living in its own process. Vocabulary and IDF are computed from
+    document frequencies gathered over all shards, so scores are comparable across shards and
+    the per-shard top results can be merged by score. Exposes the same `fit`/`search` API as `Index`.
+
+    Attributes:
+        text_fields (list): List of text field names to index.
+        keyword_fields (list): List of keyword field names to index.
+        num_shards (int): Number of shards and worker processes.
+        docs (DocStore): Documents indexed.
+    """
+
+    def __init__(
+        self,
+        text_fields,
+        keyword_fields=None,
+        vectorizer_params=None,
+        engine="dense",
+        scoring="tfidf",
+        bm25_params=None,
+        num_shards=None,
+        mp_context=None,
+        weight_dtype="float64",
+        prune_threshold=None,
+        prune_top_k=None,
+    ):
+        """
+        Initializes the ShardedIndex with specified text and keyword fields.
+
+        Args:
+            text_fields (list): List of text field names to index.
+            keyword_fields (list, optional): List of keyword field names to index. Defaults to empty list.
+            vectorizer_params (dict): Optional parameters to pass to TfidfVectorizer.
+            engine (str): Scoring engine used by every shard, see `Index`. Defaults to "dense".
+            scoring (str): Ranking function, "tfidf" or "bm25", see `Index`. Defaults to "tfidf".
+            bm25_params (dict, optional): BM25 'k1' and 'b' parameters, see `Index`.
+            num_shards (int, optional): Number of shards. Defaults to the number of CPUs.
+            mp_context (str, optional): multiprocessing start method for the workers, e.g. "spawn"
+                when the parent process runs threads. Defaults to the platform default.
+            weight_dtype (str): Storage type of the document weights of every shard, see `Index`.
+                Defaults to "float64".
+            prune_threshold (float, optional): Weights below this value are dropped, see `Index`.
+            prune_top_k (int, optional): Number of largest weights kept per document, see `Index`.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}, expected one of {ENGINES}")
+        if scoring not in SCORINGS:
+            raise ValueError(f"Unknown scoring {scoring!r}, expected one of {SCORINGS}")
+        if weight_dtype not in WEIGHT_DTYPES:
+            raise ValueError(f"Unknown weight dtype {weight_dtype!r}, expected one of {WEIGHT_DTYPES}")
+        if engine == "inverted" and scoring == "tfidf" and (vectorizer_params or {}).get("norm", "l2") != "l2":
+            raise ValueError('engine="inverted" requires L2-normalized TF-IDF rows (vectorizer norm "l2")')
+
+        self.text_fields = text_fields
+        self.keyword_fields = keyword_fields if keyword_fields is not None else []
+        self.vectorizer_params = vectorizer_params if vectorizer_params is not None else {}
+        self.engine = engine
+        self.scoring = scoring
+        self.bm25_params = bm25_params
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.mp_context = mp_context
+        self.weight_dtype = weight_dtype
+        self.prune_threshold = prune_threshold
+        self.prune_top_k = prune_top_k
+        self.docs = DocStore()
+
+        self._workers = []
+        self._offsets = []
+
+    def fit(self, docs):
+        """
+        Fits the index with the provided documents.
+
+        Documents are split into contiguous shards. Every worker counts the document
+        frequencies of its shard, the counts are combined into one vocabulary and IDF per
+        text field, and the workers then vectorize their shards with it.
+
+        Args:
+            docs (list of dict): List of documents to index. Each document is a dictionary.
+        """
+        self.close()
+        docs = list(docs)
+        self.docs = DocStore(docs)
+
+        num_shards = max(1, min(self.num_shards, len(docs)))
+        bounds = np.linspace(0, len(docs), num_shards + 1).astype(int)
+        self._offsets = bounds[:-1].tolist()
+
+        context = multiprocessing.get_context(self.mp_context)
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_shard_worker, args=(child_conn,), daemon=True)
+            process.start()
+            child_conn.close()
+            self._workers.append((process, parent_conn))
+
+            parent_conn.send(("stats", (docs[start:end], self._index_params())))
+
+        shard_stats = self._gather()
+        vocabularies = {
+            field: _global_vocabulary(
+                _make_vectorizer(self.scoring, self.vectorizer_params),
+                [stats[field] for stats in shard_stats],
+                len(self.docs),
+                self.scoring,
+            )
+            for field in self.text_fields
+        }
+
+        self._broadcast("fit", vocabularies)
+        self._gather()
+        return self
+
+    def search(self, query, filter_dict=None, boost_dict=None, num_results=10, output_fields=None):
+        """
+        Searches all shards with the given query, filters, and boost parameters.
+
+        See `Index.search` for the arguments.
+
+        Returns:
+            list of dict: List of documents matching the search criteria, ranked by relevance.
+        """
+        return self.search_batch(
+            [query],
+            filter_dicts=[filter_dict],
+            boost_dict=boost_dict,
+            num_results=num_results,
+            output_fields=output_fields,
+        )[0]
+
+    def search_batch(self, queries, filter_dicts=None, boost_dict=None, num_results=10, output_fields=None):
+        """
+        Searches all shards with many queries at once.
+
+        Every shard runs the whole batch in parallel and the per-shard top results are merged by score.
+        See `Index.search_batch` for the arguments.
+
+        Returns:
+            list of list of dict: One ranked result list per query.
+        """
+        queries = list(queries)
+        self._broadcast("search", (queries, filter_dicts, boost_dict, num_results))
+        shard_results = self._gather()
+
+        results = []
+        for row in range(len(queries)):
+            doc_ids = np.concatenate([
+                results_[row][0] + offset
+                for results_, offset in zip(shard_results, self._offsets)
+            ])
+            scores = np.concatenate([results_[row][1] for results_ in shard_results])
+            order = np.argsort(-scores, kind="stable")[:num_results]
+            results.append([self.docs.get(i, output_fields) for i in doc_ids[order]])
+
+        return results
+
+    def _index_params(self):
+        """Returns the keyword arguments of the Index built in every shard."""
+        return {
+            "text_fields": self.text_fields,
+            "keyword_fields": self.keyword_fields,
+            "vectorizer_params": self.vectorizer_params,
+            "engine": self.engine,
+            "scoring": self.scoring,
+            "bm25_params": self.bm25_params,
+            "weight_dtype": self.weight_dtype,
+            "prune_threshold": self.prune_threshold,
+            "prune_top_k": self.prune_top_k,
+        }
+
+    def close(self):
+        """Stops the worker processes."""
+        for process, conn in self._workers:
+            try:
+                conn.send(("close", None))
+            except (BrokenPipeError, OSError):
+                pass
+            conn.close()
+            process.join()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _broadcast(self, command, payload):
+        """Sends the same command to every worker."""
+        for _, conn in self._workers:
+            conn.send((command, payload))
+
+    def _gather(self):
+        """Collects one reply from every worker, re-raising worker errors."""
+        # Read every reply before raising, so no stale reply is left in a pipe for the next command
+        replies = [conn.recv() for _, conn in self._workers]
+        for status, reply in replies:
+            if status == "error":
+                raise RuntimeError(f"Shard worker failed: {reply}")
+        return [reply for _, reply in replies]
+
+
+def _shard_worker(conn):
+    """Serves one shard of a ShardedIndex: counts statistics, builds its Index and answers searches."""
+    docs = None
+    index = None
+
+    while True:
+        command, payload = conn.recv()
+        if command == "close":
+            break
+
+        try:
+            if command == "stats":
+                docs, index_params = payload
+                index = Index(**index_params)
+                reply = {
+                    field: _document_frequencies(
+                        vectorizer, [doc.get(field, "") for doc in docs]
+                    )
+                    for field, vectorizer in index.vectorizers.items()
+                }
+            elif command == "fit":
+                for field, (terms, idf, avgdl) in payload.items():
+                    index._restore_field(field, terms, idf, avgdl)
+                index._fit(docs, fit_vectorizers=False)
+                docs = None
+                reply = None
+            elif command == "search":
+                reply = index._search_ids(*payload)
+            else:
+                raise ValueError(f"Unknown command {command!r}")
+        except Exception as exc:
+            conn.send(("error", repr(exc)))
+        else:
+            conn.send(("ok", reply))
+
+    conn.close()
+
+
+def _document_frequencies(vectorizer, texts):
+    """Returns the terms of the texts with their document and total frequencies, ignoring vocabulary limits."""
+    counter = _unbounded_counter(vectorizer)
+    try:
+        counts = counter.fit_transform(texts)
+    except ValueError:
+        # Every text of the shard is empty after analysis
+        return [], np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    terms = counter.get_feature_names_out().tolist()
+    df = np.bincount(counts.indices, minlength=len(terms))
+    tf = np.asarray(counts.sum(axis=0)).ravel()
+    return terms, df, tf
+
+
+def _unbounded_counter(vectorizer):
+    """Returns a CountVectorizer that tokenizes like the given vectorizer but keeps every term."""
+    count_params = {
+        key: value for key, value in vectorizer.get_params().items()
+        if key in CountVectorizer().get_params()
+    }
+    count_params.update(min_df=1, max_df=1.0, max_features=None)
+    return CountVectorizer(**count_params)
+
+
+def _count_terms(analyzer, texts, vocabulary, binary=False):
+    """Counts the terms of the texts into a CSR matrix, giving unseen terms the next free id in `vocabulary`."""
+    indices = []
+    indptr = [0]
+    for text in texts:
+        for term in analyzer(text):
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+        indptr.append(len(indices))
+
+    counts = sparse.csr_matrix(
+        (np.ones(len(indices), dtype=np.int64), indices, indptr),
+        shape=(len(texts), len(vocabulary)),
+    )
+    counts.sum_duplicates()
+    if binary:
+        counts.data.fill(1)
+    return counts
+
+
+def _tfidf_weights(counts, vectorizer):
+    """Turns a term count matrix into the TF-IDF matrix the fitted vectorizer's `transform` would produce."""
+    transformer = TfidfTransformer(
+        norm=vectorizer.norm,
+        use_idf=vectorizer.use_idf,
+        smooth_idf=vectorizer.smooth_idf,
+        sublinear_tf=vectorizer.sublinear_tf,
+    )
+    transformer.idf_ = vectorizer.idf_
+    return transformer.transform(counts).astype(vectorizer.dtype, copy=False)
+
+
+def _global_vocabulary(vectorizer, shard_stats, num_docs, scoring):
+    """
+    Combines per-shard term statistics into the vocabulary and IDF `vectorizer.fit` would produce.
+
+    Returns:
+        tuple: Sorted list of terms, the matching IDF vector and the average document
+        length (None for TF-IDF).
+    """
+    totals = {}
+    for terms, df, tf in shard_stats:
+        for term, term_df, term_tf in zip(terms, df.tolist(), tf.tolist()):
+            counts = totals.setdefault(term, [0, 0])
+            counts[0] += term_df
+            counts[1] += term_tf
+
+    terms = sorted(totals)
+    df = np.array([totals[term][0] for term in terms], dtype=np.int64)
+    tf = np.array([totals[term][1] for term in terms], dtype=np.int64)
+
+    max_df = vectorizer.max_df if isinstance(vectorizer.max_df, int) else vectorizer.max_df * num_docs
+    min_df = vectorizer.min_df if isinstance(vectorizer.min_df, int) else vectorizer.min_df * num_docs
+    keep = (df <= max_df) & (df >= min_df)
+    if vectorizer.max_features is not None and keep.sum() > vectorizer.max_features:
+        kept = np.flatnonzero(keep)
+        top = kept[(-tf[kept]).argsort()[:vectorizer.max_features]]
+        keep = np.zeros_like(keep)
+        keep[top] = True
+    if not keep.any():
+        raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+
+    terms = [term for term, kept in zip(terms, keep) if kept]
+    df = df[keep]
+
+    if scoring == "bm25":
+        return terms, _bm25_idf(df, num_docs), tf[keep].sum() / max(num_docs, 1)
+
+    smooth = int(vectorizer.smooth_idf)
+    idf = np.log((num_docs + smooth) / (df + smooth)) + 1
+    return terms, idf, None
+
+
+def _is_default_word_analyzer(vectorizer):
+    """Returns True if the vectorizer lowercases and splits words with the stock token pattern."""
+    return (
+        vectorizer.analyzer == "word"
+        and vectorizer.lowercase
+        and vectorizer.preprocessor is None
+        and vectorizer.tokenizer is None
+        and vectorizer.token_pattern == TfidfVectorizer().token_pattern
+    )
+
+
+def _freeze(value):
+    """Turns nested dicts, lists and sets into hashable tuples for use in cache keys."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    return value
+
+
+def _make_vectorizer(scoring, vectorizer_params):
+    """Creates the vectorizer of a text field: TF-IDF weights, or raw term counts for BM25."""
+    if scoring != "bm25":
+        return TfidfVectorizer(**vectorizer_params)
+
+    count_params = CountVectorizer().get_params()
+    return CountVectorizer(**{
+        key: value for key, value in vectorizer_params.items() if key in count_params
+    })
+
+
+def _bm25_idf(df, num_docs):
+    """Returns the BM25 IDF of terms with the given document frequencies; always positive."""
+    return np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+
+def _bm25_stats(counts):
+    """Computes the BM25 IDF vector and average document length of a term count matrix."""
+    num_docs = counts.shape[0]
+    df = np.bincount(counts.indices, minlength=counts.shape[1])
+    return {
+        "idf": _bm25_idf(df, num_docs),
+        "avgdl": float(counts.sum()) / max(num_docs, 1),
+    }
+
+
+def _bm25_weights(counts, stats, k1, b):
+    """
+    Converts a term count matrix into per-document BM25 term weights.
+
+    Each nonzero becomes idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl)), where dl is
+    the length of its document, so a query scores as the sum of the weights of its terms.
+    """
+    weights = sparse.csr_matrix(counts, dtype=np.float64, copy=True)
+    doc_lengths = np.asarray(weights.sum(axis=1)).ravel()
+    avgdl = stats["avgdl"] or 1.0
+
+    tf = weights.data
+    norms = k1 * (1 - b + b * doc_lengths / avgdl)
+    row_norms = np.repeat(norms, np.diff(weights.indptr))
+    weights.data = stats["idf"][weights.indices] * tf * (k1 + 1) / (tf + row_norms)
+    return weights
+
+
+def _prune_rows(matrix, threshold=None, top_k=None):
+    """Drops the weights below `threshold` and all but the `top_k` largest weights of every row."""
+    matrix = sparse.csr_matrix(matrix, copy=True)
+    # Ties are broken on the column, so the kept terms do not depend on the order of the indices
+    matrix.sort_indices()
+    keep = np.ones(matrix.nnz, dtype=bool)
+    if threshold is not None:
+        keep &= matrix.data >= threshold
+
+    if top_k is not None:
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        order = np.lexsort((matrix.indices, -matrix.data, rows))
+        ranks = np.empty(matrix.nnz, dtype=np.int64)
+        ranks[order] = np.arange(matrix.nnz) - matrix.indptr[rows[order]]
+        keep &= ranks < top_k
+
+    matrix.data[~keep] = 0
+    matrix.eliminate_zeros()
+    return matrix
+
+
+def _quantize(matrix, scale, dtype):
+    """Stores the weights of a matrix as integers of the given dtype in units of `scale`, dropping those that round to zero."""
+    matrix = sparse.csr_matrix(matrix)
+    levels = np.clip(np.rint(matrix.data / scale), 0, np.iinfo(dtype).max).astype(dtype)
+    quantized = sparse.csr_matrix(
+        (levels, matrix.indices.copy(), matrix.indptr.copy()), shape=matrix.shape
+    )
+    quantized.eliminate_zeros()
+    return quantized
+
+
+@contextmanager
+def _replacing(path, mode, **kwargs):
+    """
+    Opens a temporary sibling of `path` for writing and moves it over `path` once written.
+
+    The old file is replaced rather than rewritten, so memory maps of it stay valid: an
+    index loaded with mmap=True (in this process or any other) keeps reading the old
+    contents, even when it is saved back to the directory it was loaded from.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _save_npy(path, array):
+    """Writes an array as a .npy file, replacing any existing file (see `_replacing`)."""
+    with _replacing(path, "wb") as f:
+        np.save(f, array)
+
+
+def _save_json(path, value, **kwargs):
+    """Writes a value as a JSON file, replacing any existing file (see `_replacing`)."""
+    with _replacing(path, "w", encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False, **kwargs)
+
+
+def _save_csr(path, prefix, matrix):
+    """Writes the data/indices/indptr arrays of a CSR matrix as .npy files."""
+    _save_npy(path / f"{prefix}_data.npy", matrix.data)
+    _save_npy(path / f"{prefix}_indices.npy", matrix.indices)
+    _save_npy(path / f"{prefix}_indptr.npy", matrix.indptr)
+
+
+def _load_csr(path, prefix, shape, mmap_mode):
+    """Rebuilds a CSR matrix from arrays written by `_save_csr` without copying them."""
+    data = np.load(path / f"{prefix}_data.npy", mmap_mode=mmap_mode)
+    indices = np.load(path / f"{prefix}_indices.npy", mmap_mode=mmap_mode)
+    indptr = np.load(path / f"{prefix}_indptr.npy", mmap_mode=mmap_mode)
+    return sparse.csr_matrix((data, indices, indptr), shape=shape, copy=False)
+
+
+def _encode_column(docs, field):
+    """Encodes one field of the documents as (buffer, offsets, kinds), or None if no document has it."""
+    parts = []
+    kinds = np.full(len(docs), _MISSING, dtype=np.uint8)
+    for row, doc in enumerate(docs):
+        if field not in doc:
+            parts.append(b"")
+            continue
+        value = doc[field]
+        if isinstance(value, str):
+            kinds[row] = _STR
+            parts.append(value.encode("utf-8"))
+        else:
+            kinds[row], data = _encode_value(value)
+            parts.append(data)
+
+    if not kinds.any():
+        return None
+
+    offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+    np.cumsum([len(part) for part in parts], out=offsets[1:])
+    buffer = np.frombuffer(b"".join(parts), dtype=np.uint8)
+    return buffer, offsets, kinds
+
+
+def _encode_value(value):
+    """Returns the kind and bytes of a non-string value: JSON if it decodes back to an equal value, else pickle."""
+    try:
+        text = json.dumps(value, ensure_ascii=False)
+        if json.loads(text) == value:
+            return _JSON, text.encode("utf-8")
+    except (TypeError, ValueError):
+        pass
+    return _PICKLE, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode_value(column, row):
+    """Decodes the value stored at `row` of a (buffer, offsets, kinds) column."""
+    buffer, offsets, kinds = column
+    data = buffer[offsets[row]:offsets[row + 1]].tobytes()
+    if kinds[row] == _STR:
+        return data.decode("utf-8")
+    if kinds[row] == _JSON:
+        return json.loads(data)
+    return pickle.loads(data)
+
+
+def _build_keyword_index(keyword_data):
+    """Maps every value of every keyword field to the sorted array of documents holding it."""
+    keyword_index = {}
+    for field, values in keyword_data.items():
+        groups = {}
+        for doc_id, value in enumerate(values):
+            groups.setdefault(value, []).append(doc_id)
+        keyword_index[field] = {
+            value: np.array(doc_ids, dtype=np.int64) for value, doc_ids in groups.items()
+        }
+    return keyword_index
+
+
+def _lookup_values(value_index, value):
+    """Returns the sorted ids of documents whose keyword equals the value, or any of the values for a list."""
+    if isinstance(value, (list, tuple, set, frozenset)):
+        parts = [value_index[v] for v in value if v in value_index]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(parts))
+    return value_index.get(value, np.empty(0, dtype=np.int64))
+
+
+def _top_rows(scores, num_results):
+    """Returns the (doc ids, scores) of the top positive entries of every row of the score matrix."""
+    # Use argpartition to get top num_results indices
+    actual_num_results = min(num_results, scores.shape[1])
+    if actual_num_results <= 0:
+        return [(np.empty(0, dtype=np.int64), np.empty(0)) for _ in range(scores.shape[0])]
+
+    top_indices = np.argpartition(scores, -actual_num_results, axis=1)[:, -actual_num_results:]
+    top_scores = np.take_along_axis(scores, top_indices, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    top_indices = np.take_along_axis(top_indices, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    # Filter out zero-score results
+    return [
+        (row_indices[row_scores > 0], row_scores[row_scores > 0])
+        for row_indices, row_scores in zip(top_indices, top_scores)
+    ]
+
+
+def _rank_candidates(doc_ids, scores, num_results):
+    """Returns the (doc ids, scores) of the top positive scoring candidates."""
+    positive = scores > 0
+    doc_ids, scores = doc_ids[positive], scores[positive]
+
+    actual_num_results = min(num_results, len(scores))
+    if actual_num_results <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
 
-        # Use argpartition to get top num_results indices
-        actual_num_results = min(num_results, len(scores))
-        if actual_num_results == 0:
-            return []
-            
-        top_indices = np.argpartition(scores, -actual_num_results)[-actual_num_results:]
-        top_indices = top_indices[np.argsort(-scores[top_indices])]
+    top = np.argpartition(scores, -actual_num_results)[-actual_num_results:]
+    top = top[np.argsort(-scores[top])]
+    return doc_ids[top], scores[top]
 
-        # Filter out zero-score results
-        top_docs = [self.docs[i] for i in top_indices if scores[i] > 0]
 
-        return top_docs
+def _concat_ranges(starts, lengths):
+    """Returns the concatenation of np.arange(start, start + length) for every pair."""
+    total = lengths.sum()
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(total)
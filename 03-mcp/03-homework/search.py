@@ -1,41 +1,16 @@
 import os
-import zipfile
 import minsearch
-from pathlib import Path
+from ingest import format_report, iter_zip_docs
 
 def load_index():
-    docs = []
-    # Iterate over all zip files in current directory
-    for zip_path in Path('.').glob('*.zip'):
-        with zipfile.ZipFile(zip_path, 'r') as z:
-            for member in z.infolist():
-                if member.is_dir():
-                    continue
-                
-                # Check for .md or .mdx extensions
-                if member.filename.endswith(('.md', '.mdx')):
-                    # Remove the first part of the path
-                    path_parts = Path(member.filename).parts
-                    if len(path_parts) > 1:
-                        filename = str(Path(*path_parts[1:]))
-                    else:
-                        filename = member.filename
-                    
-                    # Read content
-                    with z.open(member) as f:
-                        content = f.read().decode('utf-8', errors='ignore')
-                    
-                    docs.append({
-                        "filename": filename,
-                        "content": content
-                    })
-    
     # Initialize and fit minsearch index
     index = minsearch.Index(
         text_fields=["content"],
         keyword_fields=["filename"]
     )
-    index.fit(docs)
+    report = {}
+    index.fit_stream(iter_zip_docs(report=report))
+    print(format_report(report))
     return index
 
 def search(query, index):
@@ -4,6 +4,7 @@
 
 from __future__ import annotations
 
+import argparse
 import asyncio
 import json
 import sys
@@ -14,7 +15,6 @@ URL = "https://datatalks.club"
 
 
 async def run_jina_keyword_search(client, url, word="data", whole_word=False):
-    print(f"--- Testing jina-fetch-keyword-search for {url} ---")
     payload = {
         "url": url,
         "word": word,
@@ -22,6 +22,8 @@ async def run_jina_keyword_search(client, url, word="data", whole_word=False):
         "timeout": 30,
     }
     res = await client.call_tool("jina_fetch_keyword_search", payload)
+    # Print the header only now so the output of concurrent tests does not interleave
+    print(f"--- Testing jina-fetch-keyword-search for {url} ---")
 
     if hasattr(res, "content") and res.content:
         text = res.content[0].text
@@ -36,12 +38,12 @@ async def run_jina_keyword_search(client, url, word="data", whole_word=False):
         print(f"Word '{word}' count: {count}")
 
 async def run_jina_total_chars(client, url):
-    print(f"--- Testing jina-fetch-total-chars for {url} ---")
     payload = {
         "url": url,
         "timeout": 30,
     }
     res = await client.call_tool("jina_fetch_total_chars", payload)
+    print(f"--- Testing jina-fetch-total-chars for {url} ---")
 
     if hasattr(res, "content") and res.content:
         text = res.content[0].text
@@ -56,8 +58,8 @@ async def run_jina_total_chars(client, url):
         print(f"Total characters: {count}")
 
 async def run_search(client, query, num_results=3):
-    print(f"\n--- Testing documentation search for: '{query}' ---")
     res = await client.call_tool("search", {"query": query, "num_results": num_results})
+    print(f"\n--- Testing documentation search for: '{query}' ---")
     
     if hasattr(res, "content") and res.content:
         text = res.content[0].text
@@ -112,18 +114,21 @@ async def main() -> int:
             return 1
 
         async with Client(mcp_server.mcp) as client:
+            tests = []
             if args.jina_keyword_search:
                 # args.jina_keyword_search will contain the URL if provided, or the default from 'const'
-                await run_jina_keyword_search(client, args.jina_keyword_search, word=args.keyword, whole_word=args.whole_word)
+                tests.append(run_jina_keyword_search(client, args.jina_keyword_search, word=args.keyword, whole_word=args.whole_word))
             
             if args.jina_total_chars:
                 # args.jina_total_chars will contain the URL if provided
-                await run_jina_total_chars(client, args.jina_total_chars)
+                tests.append(run_jina_total_chars(client, args.jina_total_chars))
             
             if args.search:
                 # args.search will contain the query if provided
-                await run_search(client, args.search)
+                tests.append(run_search(client, args.search))
 
+            # The calls share the session and run concurrently
+            await asyncio.gather(*tests)
             return 0
     except Exception as exc:
         print(f"Failed to connect to or call the local MCP server: {exc}", file=sys.stderr)
@@ -131,5 +136,4 @@ async def main() -> int:
 
 
 if __name__ == "__main__":
-    import argparse
     sys.exit(asyncio.run(main()))
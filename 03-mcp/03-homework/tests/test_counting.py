@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from counting import MultiWordCounter, count_chunks, count_words
+from jina_download import count_word
+
+# Few letters, so words repeat, overlap and straddle chunk boundaries often
+ALPHABET = "abAB _-.\n"
+
+
+def random_text(rng, length):
+    return "".join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def random_word(rng):
+    return "".join(rng.choice("abAB") for _ in range(rng.randint(1, 4)))
+
+
+def random_chunks(rng, text):
+    """Splits the text at random positions, including empty chunks."""
+    cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 8)))
+    return [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+
+
+@pytest.mark.parametrize("whole", [False, True])
+def test_word_counter_matches_count_word(whole):
+    rng = random.Random(whole)
+    for _ in range(500):
+        text = random_text(rng, rng.randint(0, 60))
+        word = random_word(rng)
+        chunks = random_chunks(rng, text)
+        assert count_chunks(chunks, word, whole=whole) == count_word(text, word, whole=whole), (chunks, word)
+
+
+def test_word_counter_counts_matches_across_chunks():
+    assert count_chunks(["ab", "ab", "a", "b"], "aba") == count_word("ababab", "aba") == 1
+    assert count_chunks(["data ", "DA", "TA data-", "data"], "data", whole=True) == 4
+    assert count_chunks([], "data") == 0
+
+
+@pytest.mark.parametrize("whole", [False, True])
+def test_multi_word_counter_matches_count_word(whole):
+    rng = random.Random(whole)
+    for _ in range(500):
+        text = random_text(rng, rng.randint(0, 60))
+        words = [random_word(rng) for _ in range(rng.randint(1, 4))]
+        counter = MultiWordCounter(words, whole=whole)
+        for chunk in random_chunks(rng, text):
+            counter.feed(chunk)
+        expected = {word: count_word(text, word, whole=whole) for word in words}
+        assert counter.finish() == expected, (text, words)
+
+
+@pytest.mark.parametrize("whole", [False, True])
+def test_multi_word_counter_folds_case_like_re(whole):
+    # Characters that re.IGNORECASE equates although their lowercase forms differ (final sigma,
+    # dotless and dotted i, long s), or whose lowercase form is longer
+    rng = random.Random(whole)
+    letters = "σςΣsSſiIıİ "
+    for _ in range(300):
+        text = "".join(rng.choice(letters) for _ in range(rng.randint(0, 30)))
+        words = ["".join(rng.choice(letters.strip()) for _ in range(rng.randint(1, 3))) for _ in range(3)]
+        expected = {word: count_word(text, word, whole=whole) for word in words}
+        assert count_words(text, words, whole=whole) == expected, (text, words)
+
+    assert count_words("ΟΣ Σ σ", ["σ"]) == {"σ": count_word("ΟΣ Σ σ", "σ")} == {"σ": 3}
@@ -0,0 +1,80 @@
+import asyncio
+import time
+
+import httpx
+
+from cache import ResponseCache
+from fetcher import Fetcher
+
+PAGE = "# Title\n\n" + "fastmcp tools " * 20000
+
+
+def fetch_twice(cache, handler):
+    """Fetches the same page twice through the cache and returns both bodies."""
+    async def run():
+        async with Fetcher(transport=httpx.MockTransport(handler)) as fetcher:
+            first = await fetcher.fetch_text("https://example.com/page", cache=cache)
+            second = await fetcher.fetch_text("https://example.com/page", cache=cache)
+        return first, second
+
+    return asyncio.run(run())
+
+
+def test_stream_text_serves_fresh_pages_from_the_cache(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, text=PAGE, headers={"ETag": '"v1"'})
+
+    cache = ResponseCache(tmp_path)
+    assert fetch_twice(cache, handler) == (PAGE, PAGE)
+    assert len(requests) == 1
+    assert cache.stats()["hits"] == 1
+    cache.close()
+
+
+def test_stream_text_revalidates_stale_pages(tmp_path):
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=PAGE, headers={"ETag": '"v1"'})
+
+    cache = ResponseCache(tmp_path, ttl=0)
+    assert fetch_twice(cache, handler) == (PAGE, PAGE)
+    assert [request.headers.get("If-None-Match") for request in requests] == [None, '"v1"']
+    assert cache.stats()["revalidated"] == 1
+    cache.close()
+
+
+def test_stream_text_does_cache_io_off_the_event_loop(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path)
+    lookup = cache.lookup
+
+    def slow_lookup(*args, **kwargs):
+        time.sleep(0.3)  # a slow disk
+        return lookup(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "lookup", slow_lookup)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        async with Fetcher(transport=httpx.MockTransport(lambda request: httpx.Response(200, text=PAGE))) as fetcher:
+            await fetcher.fetch_text("https://example.com/page", cache=cache)
+        ticker.cancel()
+        return ticks
+
+    # Other tasks keep running while the lookup waits on the disk
+    assert asyncio.run(run()) >= 10
+    cache.close()
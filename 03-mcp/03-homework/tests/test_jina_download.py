@@ -0,0 +1,18 @@
+import asyncio
+
+import pytest
+
+from jina_download import bulk_download
+
+
+def test_bulk_download_raises_when_reading_the_urls_fails(tmp_path):
+    def urls():
+        yield from ()
+        raise OSError("cannot read the URL list")
+
+    async def run():
+        # Without a timeout a hang here would block the test run
+        return await asyncio.wait_for(bulk_download(urls(), directory=str(tmp_path), concurrency=4), 10)
+
+    with pytest.raises(OSError, match="cannot read the URL list"):
+        asyncio.run(run())
@@ -0,0 +1,75 @@
+import pytest
+
+import minsearch
+import mcp_server
+from mcp_server import PASSAGE_FIELDS, dedupe_results, load_snapshot
+
+
+def make_index(passages):
+    index = minsearch.Index(
+        text_fields=mcp_server.INDEX_TEXT_FIELDS,
+        keyword_fields=mcp_server.INDEX_KEYWORD_FIELDS,
+        id_field=mcp_server.INDEX_ID_FIELD,
+    )
+    return index.fit(passages)
+
+
+def passage(filename, content, start=0, heading="Intro"):
+    return {"filename": filename, "heading": heading, "start": start, "end": start + len(content), "content": content}
+
+
+def test_dedupe_results_keeps_passages_sharing_filename_and_offset():
+    # Members of different archives can have the same relative filename
+    index = make_index([
+        passage("docs/shared.md", "apples and pears"),
+        passage("docs/shared.md", "apples and plums"),
+        passage("docs/other.md", "oranges"),
+    ])
+    batches = index.search_batch_ids(["apples", "plums"], num_results=5)
+
+    deduped = dedupe_results(index.docs, batches)
+
+    assert sorted(doc["content"] for doc in deduped["documents"]) == ["apples and pears", "apples and plums"]
+    assert sorted(deduped["results"][0]) == [0, 1]
+    plums = deduped["results"][1]
+    assert [deduped["documents"][i]["content"] for i in plums] == ["apples and plums"]
+    assert all(list(doc) == PASSAGE_FIELDS for doc in deduped["documents"])
+
+
+def test_dedupe_results_returns_a_passage_found_by_several_queries_once():
+    index = make_index([passage("a.md", "tools and resources"), passage("b.md", "prompts")])
+    batches = index.search_batch_ids(["tools", "resources", "prompts"], num_results=5)
+
+    deduped = dedupe_results(index.docs, batches)
+
+    assert [doc["filename"] for doc in deduped["documents"]] == ["a.md", "b.md"]
+    assert deduped["results"] == [[0], [0], [1]]
+
+
+def test_load_snapshot_loads_a_passage_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp_server, "INDEX_PATH", str(tmp_path))
+    make_index([passage("a.md", "tools and resources")]).save(tmp_path)
+
+    index = load_snapshot({"archives": {}})
+
+    assert index.search("tools", output_fields=PASSAGE_FIELDS) == [passage("a.md", "tools and resources")]
+    assert index.cache_info()["max_size"] == mcp_server.INDEX_CACHE_SIZE
+
+
+def test_load_snapshot_rejects_a_whole_document_snapshot(tmp_path, monkeypatch):
+    # Indexed like the server did before passages: whole files, without heading or offsets
+    monkeypatch.setattr(mcp_server, "INDEX_PATH", str(tmp_path))
+    index = minsearch.Index(text_fields=["content"], keyword_fields=["filename"])
+    index.fit([{"filename": "a.md", "content": "tools and resources"}]).save(tmp_path)
+
+    with pytest.raises(ValueError, match="text_fields"):
+        load_snapshot({"archives": {}})
+    assert not (tmp_path / "manifest.json").exists()
+
+
+def test_load_snapshot_rejects_documents_without_passage_fields(tmp_path, monkeypatch):
+    monkeypatch.setattr(mcp_server, "INDEX_PATH", str(tmp_path))
+    make_index([{"filename": "a.md", "heading": "Intro", "content": "tools and resources"}]).save(tmp_path)
+
+    with pytest.raises(ValueError, match="start, end"):
+        load_snapshot({"archives": {}})
@@ -0,0 +1,164 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from minsearch import Index, ShardedIndex
+
+TEXT_FIELDS = ["title", "text"]
+KEYWORD_FIELDS = ["course", "section"]
+
+
+def make_docs(num_docs=300, vocab_size=400, seed=0):
+    """Documents with Zipf-distributed words, so some terms are shared widely and many are rare."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(vocab_size)])
+    probabilities = 1.0 / np.arange(1, vocab_size + 1)
+    probabilities /= probabilities.sum()
+
+    docs = []
+    for i in range(num_docs):
+        doc = {"id": str(i), "course": f"course-{i % 3}", "section": f"section-{i % 7}"}
+        for field, length in (("title", 4), ("text", 30)):
+            words = vocabulary[rng.choice(vocab_size, size=rng.integers(1, length + 1), p=probabilities)]
+            doc[field] = " ".join(words)
+        docs.append(doc)
+    return docs
+
+
+def make_queries(num_queries=300, vocab_size=400, seed=1):
+    rng = np.random.default_rng(seed)
+    return [
+        " ".join(f"w{t}" for t in rng.integers(0, vocab_size, size=rng.integers(1, 4)))
+        for _ in range(num_queries)
+    ]
+
+
+def ranking(index, query, filter_dict=None, boost_dict=None):
+    """Maps every matching doc id to its score; tied documents make the order of results arbitrary."""
+    [(doc_ids, scores)] = index._search_ids([query], [filter_dict], boost_dict, len(index.docs))
+    return dict(zip(doc_ids.tolist(), scores.tolist()))
+
+
+def assert_same_ranking(expected, actual):
+    assert expected.keys() == actual.keys()
+    for doc_id, score in expected.items():
+        assert actual[doc_id] == pytest.approx(score, rel=1e-6, abs=1e-9)
+
+
+@pytest.fixture(name="docs", scope="module")
+def docs_fixture():
+    return make_docs()
+
+
+@pytest.mark.parametrize("engine", ["dense", "inverted"])
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25"])
+def test_search_batch_matches_search(docs, engine, scoring):
+    index = Index(TEXT_FIELDS, KEYWORD_FIELDS, engine=engine, scoring=scoring).fit(docs)
+    # More queries than BATCH_CHUNK_SIZE, with filtered and unfiltered queries mixed in one chunk
+    queries = make_queries()
+    filter_dicts = [{"course": "course-1"} if i % 3 == 0 else None for i in range(len(queries))]
+    boost_dict = {"title": 3.0}
+
+    batch = index.search_batch(queries, filter_dicts, boost_dict, num_results=5)
+
+    assert len(batch) == len(queries)
+    for query, filter_dict, results in zip(queries, filter_dicts, batch):
+        assert results == index.search(query, filter_dict, boost_dict, num_results=5)
+
+
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25"])
+def test_inverted_engine_matches_dense(docs, scoring):
+    dense = Index(TEXT_FIELDS, KEYWORD_FIELDS, scoring=scoring, id_field="id").fit(docs)
+    inverted = Index(TEXT_FIELDS, KEYWORD_FIELDS, engine="inverted", scoring=scoring, id_field="id").fit(docs)
+    # Fresh segments and removed documents go through the same scoring paths
+    for index in (dense, inverted):
+        index.add(make_docs(20, seed=2))
+        index.remove(["3", "5", "8"])
+
+    for i, query in enumerate(make_queries(50)):
+        filter_dict = {"section": "section-2"} if i % 2 else None
+        boost_dict = {"text": 0.5} if i % 3 else None
+        assert_same_ranking(
+            ranking(dense, query, filter_dict, boost_dict),
+            ranking(inverted, query, filter_dict, boost_dict),
+        )
+
+
+def test_inverted_engine_rejects_unnormalized_tfidf():
+    for norm in (None, "l1"):
+        with pytest.raises(ValueError):
+            Index(TEXT_FIELDS, engine="inverted", vectorizer_params={"norm": norm})
+    Index(TEXT_FIELDS, engine="inverted", scoring="bm25", vectorizer_params={"norm": None})
+
+
+def assert_same_fit(expected, actual):
+    for field in expected.text_fields:
+        assert actual.vectorizers[field].vocabulary_ == expected.vectorizers[field].vocabulary_
+        assert np.allclose(actual.text_matrices[field].toarray(), expected.text_matrices[field].toarray())
+    assert len(actual.docs) == len(expected.docs)
+    assert list(actual.docs) == list(expected.docs)
+
+
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25"])
+@pytest.mark.parametrize("vectorizer_params", [{}, {"min_df": 2, "max_df": 0.5}, {"max_features": 50}])
+def test_fit_stream_matches_fit(docs, scoring, vectorizer_params):
+    fitted = Index(TEXT_FIELDS, KEYWORD_FIELDS, vectorizer_params=vectorizer_params, scoring=scoring).fit(docs)
+    streamed = Index(TEXT_FIELDS, KEYWORD_FIELDS, vectorizer_params=vectorizer_params, scoring=scoring)
+    streamed.fit_stream(iter(docs), batch_size=64)
+
+    assert_same_fit(fitted, streamed)
+    for query in make_queries(50):
+        assert_same_ranking(ranking(fitted, query), ranking(streamed, query))
+    assert_same_ranking(ranking(fitted, "w1", {"course": "course-2"}), ranking(streamed, "w1", {"course": "course-2"}))
+
+
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25"])
+@pytest.mark.parametrize("prune", [{"prune_top_k": 5}, {"prune_threshold": 0.2, "prune_top_k": 3}])
+def test_fit_stream_matches_fit_when_pruning(docs, scoring, prune):
+    # Many weights of a row tie (terms seen once in the document), so which ones are kept must not
+    # depend on the column order of the matrix the weights were computed in
+    fitted = Index(TEXT_FIELDS, KEYWORD_FIELDS, scoring=scoring, **prune).fit(docs)
+    streamed = Index(TEXT_FIELDS, KEYWORD_FIELDS, scoring=scoring, **prune).fit_stream(docs, batch_size=64)
+
+    assert_same_fit(fitted, streamed)
+    for query in make_queries(50):
+        assert_same_ranking(ranking(fitted, query), ranking(streamed, query))
+
+
+@pytest.mark.parametrize("engine", ["dense", "inverted"])
+@pytest.mark.parametrize("scoring", ["tfidf", "bm25"])
+def test_sharded_index_matches_index(docs, engine, scoring):
+    index = Index(TEXT_FIELDS, KEYWORD_FIELDS, engine=engine, scoring=scoring).fit(docs)
+    with ShardedIndex(TEXT_FIELDS, KEYWORD_FIELDS, engine=engine, scoring=scoring, num_shards=3) as sharded:
+        sharded.fit(docs)
+
+        queries = make_queries(50)
+        filter_dicts = [{"course": "course-0"} if i % 2 else None for i in range(len(queries))]
+        results = sharded.search_batch(queries, filter_dicts, {"title": 2.0}, num_results=len(docs))
+        for query, filter_dict, sharded_results in zip(queries, filter_dicts, results):
+            expected = ranking(index, query, filter_dict, {"title": 2.0})
+            doc_ids = [int(doc["id"]) for doc in sharded_results]
+            assert sorted(doc_ids) == sorted(expected)
+            # Merged in the order of the single index's scores, up to ties
+            scores = [expected[doc_id] for doc_id in doc_ids]
+            assert all(a >= b - 1e-9 for a, b in zip(scores, scores[1:]))
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_save_load_keeps_keyword_values_json_cannot_store(tmp_path, mmap):
+    docs = [
+        {"id": str(i), "text": f"page about tools number w{i}", "day": date(2024, 1, 1 + i % 3), "pair": (i % 2, "x")}
+        for i in range(12)
+    ]
+    index = Index(["text"], ["day", "pair"], engine="inverted").fit(docs)
+    index.save(tmp_path)
+    loaded = Index.load(tmp_path, mmap=mmap)
+
+    for filter_dict in ({"day": date(2024, 1, 2)}, {"pair": (1, "x")}, {"day": {"not": date(2024, 1, 1)}}):
+        assert loaded.search("tools", filter_dict, num_results=20) == index.search("tools", filter_dict, num_results=20)
+    assert loaded.search("tools", {"day": date(2024, 1, 3)}, num_results=20)[0]["day"] == date(2024, 1, 3)
+
+    # Saving a memory-mapped index back over its own snapshot
+    loaded.save(tmp_path)
+    assert Index.load(tmp_path).search("w5", num_results=1) == index.search("w5", num_results=1)
@@ -0,0 +1,74 @@
+"""Long-lived MCP client sessions for issuing many tool calls.
+
+``ClientPool`` opens one or more sessions to a server and keeps them open
+until the pool is closed; with a stdio server every session is one server
+process, started once instead of once per call. Calls on a session are
+multiplexed: MCP requests carry ids, so concurrent ``call_tool`` awaits (e.g.
+through ``asyncio.gather``) are pipelined over the same pipe instead of
+waiting for each other. Each call goes to the session with the fewest calls
+in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Iterable
+
+from fastmcp import Client
+
+
+class ClientPool:
+    """Pool of open client sessions to one MCP server.
+
+    Parameters
+    - server: anything fastmcp.Client accepts (a server script path, URL or
+      FastMCP instance)
+    - size: number of sessions (server processes for a stdio server)
+
+    Use it as an async context manager.
+    """
+
+    def __init__(self, server: Any, size: int = 1):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.server = server
+        self.size = size
+        self._clients: list[Client] = []
+        self._in_flight: list[int] = []
+        self._stack: AsyncExitStack | None = None
+
+    async def __aenter__(self) -> "ClientPool":
+        self._stack = AsyncExitStack()
+        try:
+            clients = [Client(self.server) for _ in range(self.size)]
+            # Start the sessions (and server processes) concurrently
+            await asyncio.gather(*(self._stack.enter_async_context(client) for client in clients))
+        except BaseException:
+            await self._stack.aclose()
+            raise
+        self._clients = clients
+        self._in_flight = [0] * self.size
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._clients = []
+        await self._stack.aclose()
+
+    async def call_tool(self, name: str, arguments: dict | None = None, **kwargs):
+        """Call a tool on the least busy session; see fastmcp.Client.call_tool."""
+        if not self._clients:
+            raise RuntimeError("the pool is not open")
+        i = min(range(len(self._clients)), key=self._in_flight.__getitem__)
+        self._in_flight[i] += 1
+        try:
+            return await self._clients[i].call_tool(name, arguments or {}, **kwargs)
+        finally:
+            self._in_flight[i] -= 1
+
+    async def call_many(self, calls: Iterable[tuple[str, dict]], return_exceptions: bool = False) -> list:
+        """Run (tool name, arguments) calls concurrently and return their results in order."""
+        return await asyncio.gather(
+            *(self.call_tool(name, arguments) for name, arguments in calls),
+            return_exceptions=return_exceptions,
+        )
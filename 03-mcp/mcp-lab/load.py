@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Load driver for the local MCP servers.
+
+Keeps a pool of sessions open and issues tool calls from concurrent workers,
+then reports calls/sec and latency percentiles.
+
+Usage examples:
+  python load.py
+  python load.py --calls 5000 --concurrency 64 --pool 2
+  python load.py --server ../03-homework/mcp_server.py --tool search --args '{"query": "tools"}'
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from client_pool import ClientPool
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Return the nearest-rank q-th percentile (0-100) of the values, or 0.0 for none."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def run_load(server, tool: str, arguments: dict, calls: int, concurrency: int, pool_size: int) -> dict:
+    """Issue `calls` tool calls from `concurrency` workers over `pool_size` sessions.
+
+    Returns the number of 'calls' and 'errors', the 'seconds' of the run (after
+    the sessions are open) and the per-call 'latencies'.
+    """
+    latencies = []
+    errors = 0
+    remaining = calls
+
+    async with ClientPool(server, size=pool_size) as pool:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    await pool.call_tool(tool, arguments)
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        seconds = time.perf_counter() - started
+
+    return {"calls": calls, "errors": errors, "seconds": seconds, "latencies": latencies}
+
+
+def format_load(result: dict) -> str:
+    """Return a human-readable summary of a load run."""
+    latencies = result["latencies"]
+    return (
+        f"{result['calls']} calls ({result['errors']} errors) in {result['seconds']:.2f}s: "
+        f"{result['calls'] / result['seconds']:.1f} calls/s; latency "
+        f"p50 {percentile(latencies, 50) * 1000:.1f}ms, p95 {percentile(latencies, 95) * 1000:.1f}ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f}ms, max {max(latencies, default=0.0) * 1000:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure tool call throughput and latency of a local MCP server.")
+    parser.add_argument("--server", default="stdio_server.py", help="Server script (default: stdio_server.py)")
+    parser.add_argument("--tool", default="hello_world", help="Tool to call (default: hello_world)")
+    parser.add_argument("--args", default='{"name": "load"}', help="Tool arguments as JSON")
+    parser.add_argument("--calls", type=int, default=1000, help="Total number of calls (default: 1000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Calls in flight at once (default: 16)")
+    parser.add_argument("--pool", type=int, default=1, help="Server sessions (processes) to spread calls over (default: 1)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.server, args.tool, json.loads(args.args), args.calls, args.concurrency, args.pool))
+    print(format_load(result))
+    if result["errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Minimal tool call metrics for the lab server.
+
+``MetricsMiddleware`` counts the calls and errors of every tool and sums their
+latency in a ``Metrics`` registry, which is read back as a dict
+(``snapshot``) or in the Prometheus text exposition format (``prometheus``).
+Latency percentiles are measured on the client side by ``load.py``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any
+
+from fastmcp.server.middleware import CallNext, Middleware, MiddlewareContext
+
+
+class Metrics:
+    """Counters keyed by name and tool, safe to update from any thread."""
+
+    def __init__(self, prefix: str = "mcp"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._values: dict[str, dict[str, float]] = {}
+
+    def inc(self, name: str, tool: str, value: float = 1) -> None:
+        """Add to the counter of a tool."""
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[tool] = series.get(tool, 0) + value
+
+    def snapshot(self) -> dict:
+        """Return the uptime and, per metric, the value of every tool."""
+        with self._lock:
+            result = {"uptime_seconds": time.time() - self.started}
+            for name, series in self._values.items():
+                result[name] = dict(series)
+            return result
+
+    def prometheus(self) -> str:
+        """Return every counter in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._values.items()):
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {full_name} counter")
+                lines.extend(f'{full_name}{{tool="{tool}"}} {value}' for tool, value in sorted(series.items()))
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware(Middleware):
+    """Record 'tool_calls_total', 'tool_errors_total' (calls that raised) and 'tool_latency_seconds_total' per tool."""
+
+    def __init__(self, metrics: Metrics):
+        self.metrics = metrics
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next: CallNext) -> Any:
+        tool = context.message.name
+        started = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception:
+            self.metrics.inc("tool_errors_total", tool)
+            raise
+        finally:
+            self.metrics.inc("tool_calls_total", tool)
+            self.metrics.inc("tool_latency_seconds_total", tool, time.perf_counter() - started)
@@ -1,11 +1,12 @@
 import asyncio
-from fastmcp import Client
+from client_pool import ClientPool
 
-client = Client("stdio_server.py")
 
-async def call_tool(name: str):
-    async with client:
-        result = await client.call_tool("hello_world", {"name": name})
-        print(result)
+async def call_tools(names: list[str]):
+    # One server process serves every call; the calls are in flight together
+    async with ClientPool("stdio_server.py") as pool:
+        results = await pool.call_many(("hello_world", {"name": name}) for name in names)
+        for result in results:
+            print(result)
 
-asyncio.run(call_tool("Ford"))
+asyncio.run(call_tools(["Ford", "Arthur", "Zaphod"]))
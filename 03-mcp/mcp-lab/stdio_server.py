@@ -1,7 +1,12 @@
 from fastmcp import FastMCP
+from metrics import Metrics, MetricsMiddleware
 
 mcp = FastMCP("My MCP Server")
 
+# Call counts, errors and total latency of every tool
+metrics = Metrics()
+mcp.add_middleware(MetricsMiddleware(metrics))
+
 
 @mcp.tool
 async def hello_world(name: str) -> str:
@@ -16,5 +21,17 @@ async def get_current_time() -> str:
     return datetime.now().isoformat()
 
 
+@mcp.tool
+def server_metrics() -> dict:
+    """Report the call count, errors and total latency of every tool."""
+    return metrics.snapshot()
+
+
+@mcp.resource("metrics://prometheus", mime_type="text/plain")
+def metrics_prometheus() -> str:
+    """Tool metrics in the Prometheus text exposition format."""
+    return metrics.prometheus()
+
+
 if __name__ == "__main__":
     mcp.run()